@@ -1,7 +1,6 @@
-from agno.agent import Agent
-from agno.models.google import Gemini
 from dotenv import load_dotenv
 import os
+from lazy import lazy_singleton
 
 load_dotenv()
 
@@ -12,18 +11,24 @@ if not GEMINI_API_KEY:
     raise ValueError("La clé API GEMINI_API_KEY n'est pas définie dans les variables d'environnement.")
 
 # Création de l'agent avec le modèle Gemini et contrôle de la température
-agent = Agent(
-    model=Gemini(id="gemini-2.0-flash", api_key=GEMINI_API_KEY, temperature=0.7),
-    description="Tu es un assistant médical spécialisé en allergologie respiratoire.",
-    instructions=[
-        "Lis attentivement le Logigramme.",
-        "Analyse la discussion entre le médecin et le patient.",
-        "Prends en compte la documentation fournie.",
-        "Utilise tes données personnelles et la documentation fournie pour approfondir les petits détails oubliés par le médecin.",
-        "Propose une seule question pertinente, pas trop longue, à poser au patient en fonction des informations disponibles."
-    ], 
-    markdown=True
-)
+# (au premier appel : agno et le SDK Gemini ne sont importés qu'à ce moment-là)
+@lazy_singleton
+def get_agent():
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+
+    return Agent(
+        model=Gemini(id="gemini-2.0-flash", api_key=GEMINI_API_KEY, temperature=0.7),
+        description="Tu es un assistant médical spécialisé en allergologie respiratoire.",
+        instructions=[
+            "Lis attentivement le Logigramme.",
+            "Analyse la discussion entre le médecin et le patient.",
+            "Prends en compte la documentation fournie.",
+            "Utilise tes données personnelles et la documentation fournie pour approfondir les petits détails oubliés par le médecin.",
+            "Propose une seule question pertinente, pas trop longue, à poser au patient en fonction des informations disponibles."
+        ], 
+        markdown=True
+    )
 
 logigramme = """
 **Logigramme pour le diagnostic des allergies respiratoires**
@@ -82,7 +87,7 @@ def retrieve_and_ask(top_docs, question, conversation_text):
     
     retrieved_texts = "\n\n".join([doc["chunk_text"] for doc in top_docs])
     # Utiliser agent.ask() au lieu de agent.print_response()
-    response = agent.run(
+    response = get_agent().run(
         f"le Logigramme : {logigramme}\n\n"
         f"Documentation : {retrieved_texts}\n\n"
         f"Discussion : {conversation_text}\n\n"
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+import numpy as np
+from qdrant_client.models import SearchParams
+
+from bench_quantization import mesurer
+from bench_upload import COLLECTION_BENCH, donnees_synthetiques, upload_parallele
+from indexall_minilm import (
+    HNSW_EF_CONSTRUCT,
+    HNSW_M,
+    activer_indexation,
+    attendre_optimisation,
+    connect_to_qdrant,
+    create_collection
+)
+
+
+def charger(client, ids, vecteurs, payloads, bulk, hnsw_m, hnsw_ef_construct, batch_size, workers):
+    """Charge les points et retourne la durée jusqu'à ce que l'index HNSW soit prêt."""
+    client.delete_collection(COLLECTION_BENCH)
+    create_collection(client, COLLECTION_BENCH, vecteurs.shape[1], bulk=bulk, hnsw_m=hnsw_m,
+                      hnsw_ef_construct=hnsw_ef_construct)
+    debut = time.perf_counter()
+    upload_parallele(client, ids, vecteurs, payloads, batch_size, workers)
+    if bulk:
+        activer_indexation(client, COLLECTION_BENCH, hnsw_m, hnsw_ef_construct)
+    else:
+        attendre_optimisation(client, COLLECTION_BENCH)
+    return time.perf_counter() - debut
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare le chargement au fil de l'eau et le chargement en masse avec HNSW différé."
+    )
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--m", type=int, default=HNSW_M, help="Voisins par nœud du graphe HNSW (les deux variantes)")
+    parser.add_argument("--ef-construct", type=int, default=HNSW_EF_CONSTRUCT,
+                        help="Largeur de recherche à la construction (les deux variantes)")
+    args = parser.parse_args()
+
+    ids, vecteurs, payloads = donnees_synthetiques(args.points, args.dim, taille_texte=200)
+    requetes = np.random.default_rng(1).standard_normal((args.queries, args.dim), dtype=np.float32)
+    client = connect_to_qdrant(prefer_grpc=True)
+
+    # Mêmes paramètres HNSW des deux côtés : seul le mode de chargement change
+    variantes = [("au fil de l'eau", False), ("en masse", True)]
+
+    print(f"\n🏗️ {args.points} points de dimension {args.dim}, {args.queries} requêtes, top-{args.top_k}, "
+          f"m={args.m} ef_construct={args.ef_construct}\n")
+    print(f"{'variante':<32} {'prêt en':>13} {'p50 (ms)':>9} {'recouvrement':>13}")
+    for nom, bulk in variantes:
+        duree = charger(client, ids, vecteurs, payloads, bulk, args.m, args.ef_construct,
+                        args.batch_size, args.workers)
+        reference, _ = mesurer(client, COLLECTION_BENCH, requetes, args.top_k, SearchParams(exact=True))
+        trouves, latences = mesurer(client, COLLECTION_BENCH, requetes, args.top_k)
+        recouvrement = sum(len(a & b) for a, b in zip(trouves, reference)) / (len(reference) * args.top_k)
+        print(f"{nom:<32} {duree:>12.1f}s {np.median(latences):>9.2f} {recouvrement:>12.1%}")
+
+    client.delete_collection(COLLECTION_BENCH)
@@ -0,0 +1,63 @@
+import argparse
+import os
+import time
+
+from embedding_backends import BACKENDS, get_backend
+from embedding_pool import pool_embedding
+from chunking import generer_chunks_paragraphes
+from extraction_cache import extract_text_cached
+
+
+def charger_chunks(folder_path, max_chunks, taille_chunk=128, chevauchement=50):
+    """Construit un échantillon de chunks à partir des PDFs du dossier."""
+    chunks = []
+    for pdf_file in sorted(f for f in os.listdir(folder_path) if f.endswith(".pdf")):
+        paragraphes = extract_text_cached(os.path.join(folder_path, pdf_file))
+        chunks.extend(generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement))
+        if len(chunks) >= max_chunks:
+            break
+    return chunks[:max_chunks]
+
+
+def mesurer(fonction, chunks):
+    """Retourne le débit (chunks/s) d'une fonction d'encodage sur l'échantillon."""
+    debut = time.perf_counter()
+    fonction(chunks)
+    duree = time.perf_counter() - debut
+    return len(chunks) / duree if duree > 0 else float("inf")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare l'encodage chunk par chunk et l'encodage par lots.")
+    parser.add_argument("--folder", default="ALLERG_IA")
+    parser.add_argument("--model", choices=sorted(BACKENDS), default="minilm")
+    parser.add_argument("--max-chunks", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="16,32,64,128")
+    parser.add_argument("--workers", default="",
+                        help="Pools d'encodage à comparer, ex. \"2,4,auto\" (lots de 64 par processus)")
+    args = parser.parse_args()
+
+    chunks = charger_chunks(args.folder, args.max_chunks)
+    if not chunks:
+        print(f"⚠️ Aucun chunk extrait de '{args.folder}' !")
+        raise SystemExit(1)
+
+    # Le cache d'embeddings est contourné : seul le coût du modèle est mesuré
+    backend = get_backend(args.model)
+
+    # Préchauffage du modèle pour ne pas mesurer l'initialisation
+    backend.encode_modele(chunks[:8], 8)
+
+    avant = mesurer(lambda textes: [backend.encode_modele([t], 1) for t in textes], chunks)
+    print(f"Avant (1 chunk par passe) : {avant:.1f} chunks/s")
+
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        apres = mesurer(lambda textes: backend.encode_modele(textes, batch_size), chunks)
+        print(f"Après (lots de {batch_size}) : {apres:.1f} chunks/s (x{apres / avant:.1f})")
+
+    for workers in (w for w in args.workers.split(",") if w):
+        with pool_embedding(workers) as (nombre, threads):
+            # Préchauffage : chaque processus charge son modèle
+            backend.encode_modele(chunks[:64 * nombre], 64)
+            debit = mesurer(lambda textes: backend.encode_modele(textes, 64), chunks)
+        print(f"Pool {nombre} processus x {threads} threads (lots de 64) : {debit:.1f} chunks/s (x{debit / avant:.1f})")
@@ -0,0 +1,100 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from transformers import AutoModel, AutoTokenizer
+
+from onnx_backend import OnnxEncoder
+
+# Modèle, pooling et longueur maximale des deux encodeurs du projet
+MODELES = {
+    "minilm": ("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", "mean", 128),
+    "sapbert": ("cambridgeltl/SapBERT-from-PubMedBERT-fulltext", "cls", 512),
+}
+
+TEXTES = [
+    "Rhinite allergique persistante avec obstruction nasale matinale et éternuements en salves.",
+    "Asthme d'effort chez l'enfant, toux nocturne et sifflements expiratoires.",
+    "Sensibilisation aux acariens Dermatophagoides pteronyssinus confirmée par prick-test.",
+    "Exposition professionnelle aux farines chez le boulanger et asthme professionnel.",
+    "Conjonctivite allergique saisonnière associée à une pollinose aux graminées.",
+    "Désensibilisation sublinguale : indications, efficacité et effets indésirables.",
+    "Mesures d'éviction des moisissures dans un logement humide.",
+    "Reflux gastro-œsophagien et toux chronique : diagnostic différentiel de l'asthme.",
+]
+
+
+def encodeur_torch(model_name, pooling, max_length):
+    """Retourne la fonction d'encodage PyTorch de référence (celle des modules d'indexation)."""
+    if pooling == "mean":
+        model = SentenceTransformer(model_name)
+        return lambda textes, batch_size: model.encode(textes, batch_size=batch_size, convert_to_numpy=True,
+                                                       show_progress_bar=False)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    def encoder(textes, batch_size):
+        vecteurs = []
+        for debut in range(0, len(textes), batch_size):
+            entrees = tokenizer(textes[debut:debut + batch_size], return_tensors="pt", padding=True,
+                                truncation=True, max_length=max_length)
+            with torch.no_grad():
+                vecteurs.append(model(**entrees).last_hidden_state[:, 0, :].numpy())
+        return np.concatenate(vecteurs)
+    return encoder
+
+
+def cosinus(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def debit(encoder, textes, batch_size, repetitions=3):
+    """Meilleur débit (textes/s) sur quelques répétitions."""
+    encoder(textes[:batch_size], batch_size)  # préchauffage
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        encoder(textes, batch_size)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return len(textes) / meilleur
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie la parité ONNX / PyTorch et compare les débits sur CPU.")
+    parser.add_argument("--model", choices=sorted(MODELES), default="minilm")
+    parser.add_argument("--batch-sizes", default="1,8,32,64")
+    parser.add_argument("--textes", type=int, default=256)
+    parser.add_argument("--seuil", type=float, default=0.99, help="Cosinus minimal attendu avec PyTorch")
+    args = parser.parse_args()
+
+    model_name, pooling, max_length = MODELES[args.model]
+    textes = (TEXTES * (args.textes // len(TEXTES) + 1))[:args.textes]
+
+    backends = {
+        "pytorch": encodeur_torch(model_name, pooling, max_length),
+        "onnx fp32": OnnxEncoder(model_name, pooling, max_length, quantize=False).encode,
+        "onnx int8": OnnxEncoder(model_name, pooling, max_length, quantize=True).encode,
+    }
+
+    print(f"\n🔬 Parité avec PyTorch ({model_name})")
+    reference = backends["pytorch"](TEXTES, len(TEXTES))
+    parite_ok = True
+    for nom in ("onnx fp32", "onnx int8"):
+        cos = cosinus(reference, backends[nom](TEXTES, len(TEXTES)))
+        parite_ok &= bool(cos.min() >= args.seuil)
+        print(f"  {nom:<10} cosinus moyen {cos.mean():.5f}, minimum {cos.min():.5f}")
+
+    print(f"\n⏱️ Débit ({len(textes)} textes, textes/s)")
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    print("  " + f"{'backend':<10}" + "".join(f"{f'lot {b}':>10}" for b in batch_sizes))
+    for nom, encoder in backends.items():
+        print("  " + f"{nom:<10}" + "".join(f"{debit(encoder, textes, b):>10.1f}" for b in batch_sizes))
+
+    if not parite_ok:
+        print(f"\n❌ Parité insuffisante (cosinus < {args.seuil}).")
+        raise SystemExit(1)
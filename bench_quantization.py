@@ -0,0 +1,124 @@
+import argparse
+import random
+import time
+
+from qdrant_client.models import PointStruct, SearchParams
+
+from collection_versions import resoudre_alias
+from indexall_minilm import (
+    COLLECTION_NAME,
+    attendre_optimisation,
+    connect_to_qdrant,
+    create_collection,
+    params_recherche
+)
+
+# Octets en RAM par dimension pour chaque représentation des vecteurs
+OCTETS_PAR_DIMENSION = {None: 4, "int8": 1, "binary": 1 / 8}
+
+
+def dimensions(client, collection_name):
+    """Retourne {nom du vecteur: dimension}, ou {None: dimension} pour une collection à vecteur unique."""
+    vecteurs = client.get_collection(collection_name).config.params.vectors
+    if isinstance(vecteurs, dict):
+        return {nom: params.size for nom, params in vecteurs.items()}
+    return {None: vecteurs.size}
+
+
+def copier_collection(client, source, cible, quantization, batch_size=256):
+    """Recopie les points d'une collection dans une nouvelle collection quantifiée, vecteurs nommés compris."""
+    dims = dimensions(client, source)
+    client.delete_collection(cible)
+    if None in dims:
+        create_collection(client, cible, dims[None], quantization=quantization)
+    else:
+        create_collection(client, cible, quantization=quantization, vectors=dims)
+
+    offset = None
+    while True:
+        points, offset = client.scroll(source, limit=batch_size, offset=offset, with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(cible, wait=True, points=[
+                PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points
+            ])
+        if offset is None:
+            break
+    attendre_optimisation(client, cible)
+
+
+def echantillon_requetes(client, collection_name, nombre, using=None, seed=0):
+    """Utilise les vecteurs (`using` : vecteur nommé) de points tirés au hasard comme requêtes (pas besoin du modèle)."""
+    points, _ = client.scroll(collection_name, limit=max(nombre * 10, 100),
+                              with_vectors=[using] if using else True)
+    random.Random(seed).shuffle(points)
+    return [p.vector[using] if using else p.vector for p in points[:nombre]]
+
+
+def percentile(valeurs, q):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(round(q * (len(valeurs) - 1))))]
+
+
+def mesurer(client, collection_name, requetes, top_k, search_params=None, using=None):
+    """Retourne les identifiants trouvés et les latences (ms) de chaque requête."""
+    ids, latences = [], []
+    for vecteur in requetes:
+        debut = time.perf_counter()
+        results = client.query_points(collection_name, query=vecteur, using=using, limit=top_k,
+                                      search_params=search_params).points
+        latences.append((time.perf_counter() - debut) * 1000)
+        ids.append({r.id for r in results})
+    return ids, latences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare une collection non quantifiée à ses variantes int8 et binaire.")
+    parser.add_argument("--collection", default=COLLECTION_NAME, help="Collection ou alias mesuré")
+    parser.add_argument("--vecteur", help="Vecteur nommé interrogé (défaut : le premier de la collection)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--garder-copies", action="store_true",
+                        help="Conserve les collections quantifiées sur le serveur après la mesure")
+    args = parser.parse_args()
+
+    client = connect_to_qdrant()
+    source = resoudre_alias(client, args.collection) or args.collection
+    dims = dimensions(client, source)
+    using = args.vecteur or next(iter(dims))
+    if using not in dims:
+        parser.error(f"vecteur {using!r} absent de '{source}' (vecteurs : {', '.join(map(str, dims))})")
+    nb_points = client.count(source, exact=True).count
+    requetes = echantillon_requetes(client, source, args.queries, using)
+
+    # Référence : recherche exacte sur les vecteurs float32
+    reference, _ = mesurer(client, source, requetes, args.top_k, SearchParams(exact=True), using)
+
+    print(f"\n📐 {source} : {nb_points} points, vecteur {using or '(unique)'} de dimension {dims[using]}, "
+          f"{len(requetes)} requêtes, top-{args.top_k}\n")
+    # RAM estimée d'après la taille des représentations (octets par dimension), hors graphe HNSW
+    print(f"{'variante':<26} {'RAM estimée':>12} {'p50 (ms)':>9} {'p99 (ms)':>9} {'recouvrement':>13}")
+
+    for quantization in (None, "int8", "binary"):
+        collection = source if quantization is None else f"{args.collection}_{quantization}"
+        variantes = [(quantization or "float32", None)]
+        if quantization is not None:
+            variantes = [
+                (f"{quantization} sans rescoring", params_recherche(args.oversampling, rescore=False)),
+                (f"{quantization} + rescoring x{args.oversampling:g}", params_recherche(args.oversampling)),
+            ]
+
+        # Tous les vecteurs de la collection sont quantifiés, pas seulement celui qui est interrogé
+        ram_mo = nb_points * sum(dims.values()) * OCTETS_PAR_DIMENSION[quantization] / 1e6
+        try:
+            if quantization is not None:
+                copier_collection(client, source, collection, quantization)
+            for nom, search_params in variantes:
+                ids, latences = mesurer(client, collection, requetes, args.top_k, search_params, using)
+                recouvrement = sum(len(a & b) for a, b in zip(ids, reference)) / (len(reference) * args.top_k)
+                print(f"{nom:<26} {ram_mo:>9.1f} Mo {percentile(latences, 0.5):>9.2f} "
+                      f"{percentile(latences, 0.99):>9.2f} {recouvrement:>12.1%}")
+        finally:
+            # Les copies occupent la RAM que la quantization doit justement économiser
+            if quantization is not None and not args.garder_copies:
+                client.delete_collection(collection)
@@ -0,0 +1,57 @@
+import argparse
+import ast
+import subprocess
+import sys
+import time
+
+# Points d'entrée de l'application
+ENTRY_POINTS = ["interface.py", "live_medical_assistant.py", "main.py"]
+
+# Modules lourds qui ne doivent plus être importés au démarrage
+MODULES_LOURDS = ["torch", "transformers", "sentence_transformers", "agno", "google.generativeai", "groq"]
+
+
+def imports_de_premier_niveau(chemin):
+    """Retourne les instructions d'import exécutées au chargement d'un script."""
+    with open(chemin, encoding="utf-8") as f:
+        arbre = ast.parse(f.read(), filename=chemin)
+    return [ast.unparse(noeud) for noeud in arbre.body if isinstance(noeud, (ast.Import, ast.ImportFrom))]
+
+
+def mesurer(imports):
+    """Exécute les imports dans un interpréteur neuf et retourne (durée, modules lourds chargés, détail)."""
+    controle = f"import sys; print('##', [m for m in {MODULES_LOURDS!r} if m in sys.modules])"
+    code = "\n".join(imports + [controle])
+    debut = time.perf_counter()
+    resultat = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    duree = time.perf_counter() - debut
+    if resultat.returncode != 0:
+        raise RuntimeError(resultat.stderr.strip().splitlines()[-1])
+
+    charges = next(ligne[3:] for ligne in resultat.stdout.splitlines() if ligne.startswith("## "))
+    detail = []
+    for ligne in resultat.stderr.splitlines():
+        if not ligne.startswith("import time:") or "cumulative" in ligne:
+            continue
+        # Format : "import time: <self µs> | <cumulé µs> | <module indenté>"
+        _, cumul, nom = ligne[len("import time:"):].split("|")
+        detail.append((int(cumul), nom.rstrip()[1:]))
+    return duree, charges, detail
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure le coût d'import au démarrage de chaque point d'entrée.")
+    parser.add_argument("--top", type=int, default=5, help="Nombre de modules les plus coûteux à afficher")
+    args = parser.parse_args()
+
+    for entry_point in ENTRY_POINTS:
+        try:
+            duree, charges, detail = mesurer(imports_de_premier_niveau(entry_point))
+        except RuntimeError as e:
+            print(f"❌ {entry_point} : {e}")
+            continue
+
+        print(f"\n🚀 {entry_point} : {duree:.2f}s d'imports (modules lourds chargés : {charges})")
+        premiers_niveaux = [(cumul, nom) for cumul, nom in detail if not nom.startswith(" ")]
+        for cumul, nom in sorted(premiers_niveaux, reverse=True)[:args.top]:
+            print(f"  {cumul / 1e6:>6.2f}s  {nom}")
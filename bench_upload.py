@@ -0,0 +1,80 @@
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from qdrant_client.models import PointStruct
+
+from indexall_minilm import connect_to_qdrant, create_collection
+from ingestion_pipeline import ecrire_lot
+
+COLLECTION_BENCH = "bench_upload"
+
+
+def donnees_synthetiques(nombre, dim, taille_texte, seed=0):
+    """Génère des vecteurs float32 aléatoires et des payloads de la taille d'un chunk."""
+    rng = np.random.default_rng(seed)
+    vecteurs = rng.standard_normal((nombre, dim), dtype=np.float32)
+    ids = [str(uuid.UUID(int=int(i) + 1)) for i in range(nombre)]
+    payloads = [
+        {"file_name": f"doc_{i // 100}.pdf", "chunk_number": i % 100 + 1, "chunk_text": "x" * taille_texte}
+        for i in range(nombre)
+    ]
+    return ids, vecteurs, payloads
+
+
+def upsert_synchrone(client, ids, vecteurs, payloads, batch_size):
+    """Référence : upserts bloquants de PointStruct portant des listes de floats Python."""
+    for i in range(0, len(ids), batch_size):
+        client.upsert(collection_name=COLLECTION_BENCH, wait=True, points=[
+            PointStruct(id=ids[j], vector=vecteurs[j].tolist(), payload=payloads[j])
+            for j in range(i, min(i + batch_size, len(ids)))
+        ])
+
+
+def upload_parallele(client, ids, vecteurs, payloads, batch_size, workers):
+    """Chemin d'ingestion : lots numpy écrits en parallèle sans attendre, puis un dernier lot avec wait=True."""
+    lots = [
+        (ids[i:i + batch_size], vecteurs[i:i + batch_size], payloads[i:i + batch_size], [])
+        for i in range(0, len(ids), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(ecrire_lot, client, COLLECTION_BENCH, lot) for lot in lots[:-1]]:
+            future.result()
+    ecrire_lot(client, COLLECTION_BENCH, lots[-1], attendre=True)
+
+
+def mesurer(client, dim, fonction, *args):
+    """Recrée la collection de test et retourne le débit (points/s) de la fonction d'écriture."""
+    client.delete_collection(COLLECTION_BENCH)
+    create_collection(client, COLLECTION_BENCH, dim)
+    debut = time.perf_counter()
+    fonction(client, *args)
+    return len(args[0]) / (time.perf_counter() - debut)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare les débits d'écriture vers une instance Qdrant locale.")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--taille-texte", type=int, default=800, help="Caractères de chunk_text par point")
+    parser.add_argument("--batch-sizes", default="50,256,1024")
+    parser.add_argument("--workers", default="1,4,8")
+    args = parser.parse_args()
+
+    ids, vecteurs, payloads = donnees_synthetiques(args.points, args.dim, args.taille_texte)
+    clients = {"rest": connect_to_qdrant(prefer_grpc=False), "grpc": connect_to_qdrant(prefer_grpc=True)}
+
+    print(f"\n📤 {args.points} points de dimension {args.dim} (points/s)")
+    reference = mesurer(clients["rest"], args.dim, upsert_synchrone, ids, vecteurs, payloads, 50)
+    print(f"  {'référence : REST, upsert bloquant par 50':<42} {reference:>9.0f}")
+
+    for transport, client in clients.items():
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            for workers in (int(w) for w in args.workers.split(",")):
+                debit = mesurer(client, args.dim, upload_parallele, ids, vecteurs, payloads, batch_size, workers)
+                nom = f"{transport}, lots de {batch_size}, {workers} worker(s)"
+                print(f"  {nom:<42} {debit:>9.0f}  (x{debit / reference:.1f})")
+
+    clients["rest"].delete_collection(COLLECTION_BENCH)
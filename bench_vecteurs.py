@@ -0,0 +1,124 @@
+import argparse
+import gc
+import json
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+import numpy as np
+from qdrant_client.models import PointStruct
+
+from indexall_minilm import EMBEDDING_BATCH_SIZE, connect_to_qdrant, create_collection
+from ingestion_pipeline import ecrire_lot, matrices_float32, tranche
+
+COLLECTION_BENCH = "bench_vecteurs"
+
+
+def sorties_encodeur(nombre, dim, embedding_batch_size, seed=0):
+    """Simule l'encodeur : une matrice float32 par passe du modèle."""
+    rng = np.random.default_rng(seed)
+    for debut in range(0, nombre, embedding_batch_size):
+        yield debut, rng.standard_normal((min(embedding_batch_size, nombre - debut), dim), dtype=np.float32)
+
+
+def chemin_listes(sorties, ids, payloads, batch_size, ecrire):
+    """Ancien chemin : `.tolist()` sur la sortie de l'encodeur, un PointStruct par chunk, gardé jusqu'au flush du lot."""
+    points = []
+    for debut, matrice in sorties:
+        for i, vecteur in enumerate(matrice.tolist()):
+            points.append(PointStruct(id=ids[debut + i], vector=vecteur, payload=payloads[debut + i]))
+            if len(points) >= batch_size:
+                ecrire(points)
+                points = []
+    if points:
+        ecrire(points)
+
+
+def chemin_numpy(sorties, ids, payloads, batch_size, ecrire):
+    """Chemin actuel : la matrice float32 de l'encodeur est découpée en vues, sans copie, jusqu'à l'écriture."""
+    for debut, matrice in sorties:
+        vecteurs = matrices_float32(matrice)
+        for i in range(0, len(vecteurs), batch_size):
+            fin = min(i + batch_size, len(vecteurs))
+            ecrire((ids[debut + i:debut + fin], tranche(vecteurs, i, fin), payloads[debut + i:debut + fin], []))
+
+
+VARIANTES = {"listes": chemin_listes, "numpy": chemin_numpy}
+
+
+def octets_par_vecteur(variante, dim):
+    """Mémoire occupée par un vecteur en attente d'écriture : liste de floats Python ou ligne d'une matrice float32."""
+    if variante == "listes":
+        return sys.getsizeof([0.0] * dim) + dim * sys.getsizeof(0.0)
+    return dim * np.dtype(np.float32).itemsize
+
+
+def rss_courant_ko():
+    """RSS actuel du processus (Linux), en Ko."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def profiler(variante, nombre, dim, batch_size, embedding_batch_size, qdrant):
+    """Exécute une variante et retourne sa durée, l'augmentation du pic de RSS et le nombre de passes du GC."""
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(nombre)]
+    payloads = [{"file_name": f"doc_{i // 100}.pdf", "chunk_number": i % 100 + 1} for i in range(nombre)]
+
+    if qdrant:
+        client = connect_to_qdrant()
+        client.delete_collection(COLLECTION_BENCH)
+        create_collection(client, COLLECTION_BENCH, dim)
+        if variante == "listes":
+            ecrire = lambda points: client.upsert(collection_name=COLLECTION_BENCH, points=points, wait=False)
+        else:
+            ecrire = lambda lot: ecrire_lot(client, COLLECTION_BENCH, lot)
+    else:
+        # Sans Qdrant, on mesure le seul coût côté application, jusqu'à l'appel d'écriture
+        ecrire = lambda lot: None
+
+    gc.collect()
+    rss_initial = rss_courant_ko()
+    passes_gc = sum(s["collections"] for s in gc.get_stats())
+    debut = time.perf_counter()
+    VARIANTES[variante](sorties_encodeur(nombre, dim, embedding_batch_size), ids, payloads, batch_size, ecrire)
+    duree = time.perf_counter() - debut
+    if qdrant:
+        client.delete_collection(COLLECTION_BENCH)
+    return {
+        "duree": duree,
+        "pic_rss_ko": max(0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_initial),
+        "passes_gc": sum(s["collections"] for s in gc.get_stats()) - passes_gc,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Profil mémoire et temps du chemin des vecteurs, de l'encodeur à l'écriture Qdrant."
+    )
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=50, help="Points par écriture Qdrant")
+    parser.add_argument("--embedding-batch-size", type=int, default=EMBEDDING_BATCH_SIZE,
+                        help="Chunks par passe du modèle")
+    parser.add_argument("--qdrant", action="store_true", help="Écrit réellement les points dans une instance locale")
+    parser.add_argument("--variante", choices=sorted(VARIANTES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variante:
+        # Processus enfant : une seule variante, pour que le pic de RSS ne dépende pas de l'autre
+        print(json.dumps(profiler(args.variante, args.points, args.dim, args.batch_size,
+                                  args.embedding_batch_size, args.qdrant)))
+        sys.exit(0)
+
+    print(f"\n🧮 {args.points} vecteurs de dimension {args.dim}, passes de {args.embedding_batch_size}, "
+          f"lots de {args.batch_size}{', écriture Qdrant' if args.qdrant else ''}\n")
+    print(f"{'variante':<8} {'durée':>8} {'µs/chunk':>9} {'pic RSS':>10} {'octets/vecteur':>15} {'passes GC':>10}")
+    for variante in VARIANTES:
+        commande = [sys.executable, __file__, "--variante", variante, "--points", str(args.points),
+                    "--dim", str(args.dim), "--batch-size", str(args.batch_size),
+                    "--embedding-batch-size", str(args.embedding_batch_size)] + (["--qdrant"] if args.qdrant else [])
+        r = json.loads(subprocess.run(commande, capture_output=True, text=True, check=True).stdout.splitlines()[-1])
+        print(f"{variante:<8} {r['duree']:>7.2f}s {r['duree'] / args.points * 1e6:>9.1f} "
+              f"{r['pic_rss_ko'] / 1024:>7.1f} Mo {octets_par_vecteur(variante, args.dim):>15} {r['passes_gc']:>10}")
@@ -0,0 +1,123 @@
+def generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement):
+    """Génère des chunks en fonction du nombre de mots avec chevauchement."""
+    chunks = []
+    mots = " ".join(paragraphes).split()
+    n = len(mots)
+
+    if chevauchement >= taille_chunk:
+        raise ValueError("Le chevauchement doit être inférieur à la taille du chunk.")
+
+    debut = 0
+    while debut < n:
+        fin = min(debut + taille_chunk, n)
+        chunk = " ".join(mots[debut:fin])
+        chunks.append(chunk)
+
+        if fin == n:
+            break
+
+        debut += (taille_chunk - chevauchement)
+
+    return chunks
+
+
+class ChunkerFlux:
+    """Découpe un flux de mots en chunks chevauchants, au fur et à mesure.
+
+    Produit exactement les mêmes chunks que `generer_chunks_paragraphes`, en
+    ne gardant en mémoire que la fenêtre courante (au plus `taille_chunk + 1`
+    mots). Un chunk n'est émis qu'une fois qu'un mot supplémentaire est arrivé,
+    car c'est ce qui distingue un chunk intermédiaire du dernier chunk.
+    """
+
+    def __init__(self, taille_chunk, chevauchement):
+        if chevauchement >= taille_chunk:
+            raise ValueError("Le chevauchement doit être inférieur à la taille du chunk.")
+        self.taille_chunk = taille_chunk
+        self.pas = taille_chunk - chevauchement
+        self.fenetre = []
+
+    def ajouter(self, mots):
+        """Ajoute des mots au flux et retourne les chunks complets."""
+        chunks = []
+        for mot in mots:
+            self.fenetre.append(mot)
+            if len(self.fenetre) > self.taille_chunk:
+                chunks.append(" ".join(self.fenetre[:self.taille_chunk]))
+                del self.fenetre[:self.pas]
+        return chunks
+
+    def terminer(self):
+        """Termine le flux et retourne le dernier chunk éventuel."""
+        chunks = [" ".join(self.fenetre)] if self.fenetre else []
+        self.fenetre = []
+        return chunks
+
+
+def iter_chunks_mots(mots_par_page, taille_chunk, chevauchement):
+    """Génère les chunks d'un flux de listes de mots (une liste par page)."""
+    chunker = ChunkerFlux(taille_chunk, chevauchement)
+    for mots in mots_par_page:
+        yield from chunker.ajouter(mots)
+    yield from chunker.terminer()
+
+
+def generer_chunks_tokens(paragraphes, tokenizer, max_tokens, chevauchement_tokens):
+    """Génère des chunks remplis jusqu'à la longueur maximale réelle du modèle.
+
+    Le texte est tokenisé une seule fois avec le tokenizer rapide du modèle
+    d'embedding. Chaque chunk contient au plus `max_tokens` tokens (tokens
+    spéciaux compris) et reprend les `chevauchement_tokens` derniers tokens
+    du précédent. Les bornes sont recalées sur des débuts de mots pour qu'un
+    chunk retokenisé ne dépasse pas le budget.
+    """
+    texte = " ".join(paragraphes)
+    budget = max_tokens - tokenizer.num_special_tokens_to_add(pair=False)
+
+    if chevauchement_tokens >= budget:
+        raise ValueError("Le chevauchement doit être inférieur au nombre de tokens par chunk.")
+
+    encodage = tokenizer(texte, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    offsets = encodage["offset_mapping"]
+    word_ids = encodage.word_ids()
+    n = len(offsets)
+
+    def debut_de_mot(i):
+        return i == 0 or i >= n or word_ids[i] is None or word_ids[i] != word_ids[i - 1]
+
+    chunks = []
+    debut = 0
+    while debut < n:
+        fin = min(debut + budget, n)
+        # Ne pas couper un mot en deux, sauf s'il dépasse à lui seul le budget
+        while fin < n and fin > debut + 1 and not debut_de_mot(fin):
+            fin -= 1
+        if fin < n and not debut_de_mot(fin):
+            fin = min(debut + budget, n)
+
+        chunks.append(texte[offsets[debut][0]:offsets[fin - 1][1]])
+
+        if fin == n:
+            break
+
+        suivant = max(fin - chevauchement_tokens, debut + 1)
+        while suivant < fin and not debut_de_mot(suivant):
+            suivant += 1
+        debut = suivant
+
+    return chunks
+
+
+def mesurer_troncature(chunks, tokenizer, max_tokens):
+    """Mesure les tokens perdus par la troncature du modèle sur des chunks existants."""
+    longueurs = [len(ids) for ids in tokenizer(chunks, add_special_tokens=True, verbose=False)["input_ids"]]
+    perdus = [max(0, longueur - max_tokens) for longueur in longueurs]
+    total = sum(longueurs)
+
+    return {
+        "chunks": len(chunks),
+        "chunks_tronques": sum(1 for p in perdus if p),
+        "tokens": total,
+        "tokens_perdus": sum(perdus),
+        "part_perdue": sum(perdus) / total if total else 0.0,
+    }
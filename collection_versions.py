@@ -0,0 +1,231 @@
+import argparse
+import os
+import shutil
+import time
+
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation
+)
+
+from doc_store import DOC_STORE_DIR
+from index_checkpoint import supprimer_checkpoint
+from index_manifest import chemin_manifest
+from indexall_minilm import (
+    COLLECTION_NAME,
+    VECTEURS,
+    attendre_optimisation,
+    connect_to_qdrant,
+    create_collection,
+    index_incremental
+)
+
+# Nombre de versions conservées derrière un alias (la version active comprise), pour pouvoir revenir en arrière
+VERSIONS_CONSERVEES = 2
+
+# Une nouvelle version doit contenir au moins cette part des points de la version active pour être validée
+RATIO_POINTS_MIN = 0.5
+
+# Suffixe de l'alias qui marque une version en échec de validation (conservée pour analyse)
+SUFFIXE_ECHEC = "_echec"
+
+
+def resoudre_alias(client, alias):
+    """Retourne la collection vers laquelle pointe l'alias, ou None s'il n'existe pas."""
+    for alias_existant in client.get_aliases().aliases:
+        if alias_existant.alias_name == alias:
+            return alias_existant.collection_name
+    return None
+
+
+def lister_versions(client, alias, echecs=False):
+    """Versions valides de l'alias (avec `echecs` : celles en échec), des plus anciennes aux plus récentes."""
+    prefixe = f"{alias}_v"
+    en_echec = versions_en_echec(client, alias)
+    return sorted(c.name for c in client.get_collections().collections
+                  if c.name.startswith(prefixe) and (c.name in en_echec) == echecs)
+
+
+def versions_en_echec(client, alias):
+    """Versions de l'alias marquées en échec de validation (alias `<version>_echec`)."""
+    prefixe = f"{alias}_v"
+    return {a.collection_name for a in client.get_aliases().aliases
+            if a.alias_name.endswith(SUFFIXE_ECHEC) and a.collection_name.startswith(prefixe)}
+
+
+def marquer_echec(client, collection_name):
+    """Marque une version en échec : elle est exclue du retour arrière et des versions conservées."""
+    client.update_collection_aliases(change_aliases_operations=[CreateAliasOperation(
+        create_alias=CreateAlias(collection_name=collection_name, alias_name=collection_name + SUFFIXE_ECHEC)
+    )])
+
+
+def retirer_marque_echec(client, collection_name):
+    """Retire la marque d'échec d'une version validée."""
+    client.update_collection_aliases(change_aliases_operations=[DeleteAliasOperation(
+        delete_alias=DeleteAlias(alias_name=collection_name + SUFFIXE_ECHEC)
+    )])
+
+
+def nom_version(alias):
+    """Nom d'une nouvelle version : l'alias suffixé par la date de construction."""
+    return f"{alias}_v{time.strftime('%Y%m%d_%H%M%S')}"
+
+
+def valider_collection(client, collection_name, collection_active=None, ratio_min=RATIO_POINTS_MIN):
+    """Vérifie qu'une version peut être servie : index prêt, points présents, recherche fonctionnelle.
+
+    La recherche est testée avec le vecteur (ou chaque vecteur nommé) d'un
+    point de la collection, qui doit se retrouver dans les résultats ; aucun
+    modèle n'est chargé. Lève ValueError si une vérification échoue.
+    """
+    attendre_optimisation(client, collection_name)
+    nombre = client.count(collection_name=collection_name, exact=True).count
+    if nombre == 0:
+        raise ValueError(f"La collection '{collection_name}' est vide.")
+    if collection_active is not None:
+        nombre_actif = client.count(collection_name=collection_active, exact=True).count
+        if nombre < ratio_min * nombre_actif:
+            raise ValueError(f"'{collection_name}' ne contient que {nombre} points contre {nombre_actif} "
+                             f"dans la version active '{collection_active}'.")
+
+    points, _ = client.scroll(collection_name, limit=1, with_vectors=True, with_payload=False)
+    vecteurs = points[0].vector
+    requetes = vecteurs.items() if isinstance(vecteurs, dict) else [(None, vecteurs)]
+    for nom, vecteur in requetes:
+        resultats = client.search(collection_name=collection_name, limit=5,
+                                  query_vector=(nom, vecteur) if nom else vecteur)
+        if points[0].id not in {r.id for r in resultats}:
+            raise ValueError(f"La recherche sur '{collection_name}' (vecteur {nom or 'unique'}) ne retrouve pas "
+                             f"un point de la collection.")
+    print(f"✅ Version '{collection_name}' validée ({nombre} points).")
+
+
+def basculer_alias(client, alias, collection_name):
+    """Fait pointer l'alias vers une collection, en une seule opération atomique côté Qdrant.
+
+    Exception : une ancienne collection non versionnée qui porte le nom de
+    l'alias doit être supprimée avant de créer l'alias (Qdrant refuse un alias
+    homonyme d'une collection, et les alias ne se créent pas dans le même lot
+    qu'une suppression). Les requêtes échouent pendant ce court intervalle.
+    """
+    operations = []
+    if resoudre_alias(client, alias) is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        # Ancienne collection non versionnée portant le nom de l'alias : elle doit disparaître pour libérer le nom
+        print(f"⚠️ Collection non versionnée '{alias}' supprimée pour créer l'alias : "
+              f"indisponible jusqu'à la création de l'alias.")
+        client.delete_collection(alias)
+    operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    print(f"🔀 Alias '{alias}' → '{collection_name}'.")
+
+
+def supprimer_version(client, collection_name):
+    """Supprime une version ainsi que son manifest, son checkpoint et son store de documents locaux."""
+    client.delete_collection(collection_name)
+    if os.path.exists(chemin_manifest(collection_name)):
+        os.remove(chemin_manifest(collection_name))
+    supprimer_checkpoint(collection_name)
+    shutil.rmtree(os.path.join(DOC_STORE_DIR, collection_name), ignore_errors=True)
+    print(f"🗑️ Version '{collection_name}' supprimée.")
+
+
+def purger_versions(client, alias, garder=VERSIONS_CONSERVEES):
+    """Supprime les versions valides les plus anciennes au-delà de `garder`, sans jamais toucher la version active.
+
+    Seule la dernière version en échec est conservée pour analyse.
+    """
+    active = resoudre_alias(client, alias)
+    anciennes = [v for v in lister_versions(client, alias) if v != active]
+    a_supprimer = anciennes[:max(0, len(anciennes) - (garder - 1))] + lister_versions(client, alias, echecs=True)[:-1]
+    for collection_name in a_supprimer:
+        supprimer_version(client, collection_name)
+
+
+def reconstruire(client, alias, folder_path, garder=VERSIONS_CONSERVEES, **options):
+    """Reconstruit l'index dans une nouvelle version, puis y bascule l'alias une fois la version validée.
+
+    Pendant la construction, les applications continuent d'interroger l'alias,
+    qui pointe toujours vers la version active. La nouvelle version reste
+    marquée en échec (`marquer_echec`) jusqu'à sa validation : une
+    construction interrompue (erreur, processus tué) ou invalide n'est
+    jamais proposée au retour arrière ni comptée dans les versions gardées,
+    mais reste conservée pour analyse. `options` est transmis à
+    `index_incremental` (vectors, dedup…).
+    """
+    debut = time.perf_counter()
+    active = resoudre_alias(client, alias)
+    if active is None and client.collection_exists(alias):
+        active = alias
+
+    nouvelle = nom_version(alias)
+    print(f"🏗️ Construction de '{nouvelle}' (version active : {active or 'aucune'}).")
+    create_collection(client, nouvelle, vectors=options.get("vectors"), bulk=True)
+    marquer_echec(client, nouvelle)
+    try:
+        index_incremental(client, nouvelle, folder_path, bulk=True, **options)
+        if options.get("progression") is not None:
+            options["progression"].changer_etape("validation de la nouvelle version")
+        valider_collection(client, nouvelle, active)
+    except BaseException:
+        print(f"❌ Construction de '{nouvelle}' en échec : l'alias '{alias}' n'est pas modifié.")
+        raise
+    retirer_marque_echec(client, nouvelle)
+    basculer_alias(client, alias, nouvelle)
+    purger_versions(client, alias, garder)
+    print(f"✅ Reconstruction de '{alias}' terminée en {time.perf_counter() - debut:.1f}s, sans interruption.")
+    return nouvelle
+
+
+def preparer_collection(client, alias, folder_path, **options):
+    """Retourne le nom à interroger par les applications (l'alias), en créant la première version si besoin.
+
+    Si l'alias existe, les PDFs nouveaux ou modifiés sont ajoutés à la version
+    active (indexation incrémentale, sans coupure). Une collection historique
+    portant déjà le nom de l'alias est utilisée telle quelle jusqu'à la
+    prochaine reconstruction.
+    """
+    active = resoudre_alias(client, alias)
+    if active is None and client.collection_exists(alias):
+        active = alias
+    if active is None:
+        reconstruire(client, alias, folder_path, **options)
+    else:
+        index_incremental(client, active, folder_path, **options)
+    return alias
+
+
+def revenir_version_precedente(client, alias):
+    """Rebascule l'alias sur la version valide conservée qui précède la version active."""
+    active = resoudre_alias(client, alias)
+    precedentes = [v for v in lister_versions(client, alias) if active is None or v < active]
+    if not precedentes:
+        raise ValueError(f"Aucune version antérieure à '{active}' pour l'alias '{alias}'.")
+    basculer_alias(client, alias, precedentes[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versions de l'index derrière un alias Qdrant.")
+    parser.add_argument("action", choices=["etat", "reconstruire", "revenir"])
+    parser.add_argument("--alias", default=COLLECTION_NAME)
+    parser.add_argument("--folder", default="ALLERG_IA")
+    parser.add_argument("--garder", type=int, default=VERSIONS_CONSERVEES)
+    args = parser.parse_args()
+
+    client = connect_to_qdrant()
+    if args.action == "reconstruire":
+        reconstruire(client, args.alias, args.folder, garder=args.garder, vectors=VECTEURS, dedup=True)
+    elif args.action == "revenir":
+        revenir_version_precedente(client, args.alias)
+
+    active = resoudre_alias(client, args.alias)
+    print(f"\n🏷️ Alias '{args.alias}' → {active or 'aucune collection'}")
+    for version in lister_versions(client, args.alias):
+        nombre = client.count(collection_name=version, exact=True).count
+        print(f"  {'*' if version == active else ' '} {version} ({nombre} points)")
+    for version in lister_versions(client, args.alias, echecs=True):
+        print(f"  ✗ {version} (échec de validation)")
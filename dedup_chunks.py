@@ -0,0 +1,211 @@
+import re
+import zlib
+
+import numpy as np
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchAny,
+    SetPayload,
+    SetPayloadOperation
+)
+
+from doc_store import get_doc_store
+
+# Similarité de Jaccard estimée (sur les shingles de mots) au-delà de laquelle deux chunks sont des doublons
+SEUIL_DOUBLON = 0.8
+
+# Nombre de mots consécutifs par shingle
+TAILLE_SHINGLE = 5
+
+# Signature MinHash : NB_PERMUTATIONS valeurs découpées en BANDES bandes pour le LSH
+NB_PERMUTATIONS = 128
+BANDES = 32
+
+# Nombre premier de Mersenne 2^31 - 1 : (a * x + b) tient dans un entier 64 bits
+PREMIER = (1 << 31) - 1
+
+
+def shingles(texte, taille_shingle=TAILLE_SHINGLE):
+    """Retourne les empreintes 32 bits des suites de `taille_shingle` mots (minuscules, sans ponctuation)."""
+    mots = re.findall(r"\w+", texte.lower())
+    if not mots:
+        return np.empty(0, dtype=np.uint64)
+    pas = max(1, len(mots) - taille_shingle + 1)
+    return np.unique(np.fromiter(
+        (zlib.crc32(" ".join(mots[i:i + taille_shingle]).encode("utf-8")) for i in range(pas)),
+        dtype=np.uint64, count=pas
+    ))
+
+
+class DeduplicateurChunks:
+    """Détection des chunks quasi dupliqués par MinHash et LSH (locality-sensitive hashing).
+
+    Chaque chunk est résumé par une signature MinHash de ses shingles de mots ;
+    la signature est découpée en `bandes` bandes et deux chunks qui partagent
+    une bande sont candidats. Un candidat est retenu comme doublon si la
+    similarité de Jaccard estimée (part des valeurs de signature égales)
+    atteint `seuil`. Seuls les chunks conservés sont indexés : les buckets
+    restent petits même quand le corpus répète beaucoup le même texte.
+    Les points déjà présents dans la collection peuvent être enregistrés
+    avant le run (`amorcer_deduplicateur`).
+    """
+
+    def __init__(self, seuil=SEUIL_DOUBLON, nb_permutations=NB_PERMUTATIONS, bandes=BANDES,
+                 taille_shingle=TAILLE_SHINGLE, seed=0):
+        if nb_permutations % bandes:
+            raise ValueError("nb_permutations doit être un multiple de bandes.")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PREMIER, nb_permutations, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, PREMIER, nb_permutations, dtype=np.uint64)[:, None]
+        self.seuil = seuil
+        self.bandes = bandes
+        self.lignes = nb_permutations // bandes
+        self.taille_shingle = taille_shingle
+        self.buckets = [{} for _ in range(bandes)]
+        self.signatures = []
+        self.cles = []
+
+    def signature(self, texte):
+        """Retourne la signature MinHash d'un texte, ou None s'il ne contient aucun mot."""
+        empreintes = shingles(texte, self.taille_shingle)
+        if not len(empreintes):
+            return None
+        return ((self.a * (empreintes[None, :] % PREMIER) + self.b) % PREMIER).min(axis=1).astype(np.uint32)
+
+    def _bandes(self, signature):
+        for i in range(self.bandes):
+            yield i, signature[i * self.lignes:(i + 1) * self.lignes].tobytes()
+
+    def trouver_ou_ajouter(self, texte, cle):
+        """Retourne la clé du chunk déjà vu dont `texte` est un quasi-doublon, sinon enregistre `cle` et retourne None.
+
+        Un chunk déjà enregistré sous sa propre clé (point écrit par un run
+        interrompu) n'est pas son propre doublon.
+        """
+        signature = self.signature(texte)
+        if signature is None:
+            return None
+
+        vus = set()
+        for i, bande in self._bandes(signature):
+            for candidat in self.buckets[i].get(bande, ()):
+                if candidat in vus:
+                    continue
+                vus.add(candidat)
+                if np.mean(self.signatures[candidat] == signature) >= self.seuil:
+                    return None if self.cles[candidat] == cle else self.cles[candidat]
+
+        self._ajouter(signature, cle)
+        return None
+
+    def ajouter(self, texte, cle):
+        """Enregistre un chunk sans chercher de doublon (point déjà indexé)."""
+        signature = self.signature(texte)
+        if signature is not None:
+            self._ajouter(signature, cle)
+
+    def _ajouter(self, signature, cle):
+        numero = len(self.signatures)
+        self.signatures.append(signature)
+        self.cles.append(cle)
+        for i, bande in self._bandes(signature):
+            self.buckets[i].setdefault(bande, []).append(numero)
+
+
+def _scroller(client, collection_name, filtre, champs):
+    """Parcourt tous les points qui satisfont un filtre, avec seulement les champs de payload demandés."""
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name, scroll_filter=filtre, limit=256, offset=offset,
+                                       with_payload=champs, with_vectors=False)
+        yield from points
+        if offset is None:
+            return
+
+
+def amorcer_deduplicateur(deduplicateur, client, collection_name):
+    """Enregistre dans le déduplicateur les chunks déjà indexés de la collection ; retourne leur nombre.
+
+    Les chunks stockés par offsets sont relus depuis le store de documents.
+    """
+    champs = ["chunk_text", "doc_id", "start", "end"]
+    nombre = 0
+    page = []
+    for point in _scroller(client, collection_name, None, champs):
+        page.append(point)
+        if len(page) == 256:
+            nombre += _amorcer_page(deduplicateur, collection_name, page)
+            page = []
+    return nombre + _amorcer_page(deduplicateur, collection_name, page)
+
+
+def _amorcer_page(deduplicateur, collection_name, points):
+    textes = [point.payload.get("chunk_text") for point in points]
+    a_hydrater = [i for i, texte in enumerate(textes) if texte is None and "doc_id" in points[i].payload]
+    if a_hydrater:
+        refs = [(points[i].payload["doc_id"], points[i].payload["start"], points[i].payload["end"]) for i in a_hydrater]
+        for i, texte in zip(a_hydrater, get_doc_store(collection_name).hydrater(refs)):
+            textes[i] = texte
+    for point, texte in zip(points, textes):
+        if texte:
+            deduplicateur.ajouter(texte, point.id)
+    return len(points)
+
+
+def _ecrire_doublons(client, collection_name, doublons_par_point):
+    """Remplace en une requête la liste des sources dupliquées de chaque point."""
+    if not doublons_par_point:
+        return
+    client.batch_update_points(collection_name, wait=True, update_operations=[
+        SetPayloadOperation(set_payload=SetPayload(
+            payload={"doublons": doublons, "fichiers_doublons": sorted({d["file_name"] for d in doublons})},
+            points=[point_id]
+        ))
+        for point_id, doublons in doublons_par_point.items()
+    ])
+
+
+def fusionner_doublons(client, collection_name, doublons):
+    """Enregistre sur les points conservés les sources (fichier, numéro de chunk) de leurs doublons écartés.
+
+    `doublons` associe à l'identifiant d'un point la liste des [file_name,
+    chunk_number] de ses doublons. Un point conservé peut venir d'un run
+    précédent (déduplicateur amorcé) : ses sources déjà enregistrées sont
+    relues et conservées. Les écritures étant appliquées dans l'ordre par
+    Qdrant, les upserts non bloquants qui précèdent sont visibles.
+    """
+    existants = client.retrieve(collection_name, ids=list(doublons), with_payload=["doublons"], with_vectors=False)
+    for point in existants:
+        doublons[point.id] = list(doublons[point.id]) + [
+            [d["file_name"], d["chunk_number"]] for d in point.payload.get("doublons", [])
+        ]
+    _ecrire_doublons(client, collection_name, {
+        point_id: [{"file_name": file_name, "chunk_number": chunk_number}
+                   for file_name, chunk_number in sorted({tuple(source) for source in sources})]
+        for point_id, sources in doublons.items()
+    })
+
+
+def retirer_doublons(client, collection_name, file_names):
+    """Retire des points conservés les sources dupliquées provenant des fichiers donnés."""
+    filtre = Filter(must=[FieldCondition(key="fichiers_doublons", match=MatchAny(any=list(file_names)))])
+    a_retirer = set(file_names)
+    mises_a_jour = {
+        point.id: [d for d in point.payload.get("doublons", []) if d["file_name"] not in a_retirer]
+        for point in _scroller(client, collection_name, filtre, ["doublons"])
+    }
+    _ecrire_doublons(client, collection_name, mises_a_jour)
+
+
+def fichiers_dependants(client, collection_name, file_names):
+    """Fichiers dont des chunks ont été fusionnés dans des points appartenant aux fichiers donnés.
+
+    Supprimer les points de ces fichiers fait disparaître ces chunks de
+    l'index : les fichiers dépendants doivent être réindexés.
+    """
+    filtre = Filter(must=[FieldCondition(key="file_name", match=MatchAny(any=list(file_names)))])
+    dependants = set()
+    for point in _scroller(client, collection_name, filtre, ["fichiers_doublons"]):
+        dependants.update(point.payload.get("fichiers_doublons", []))
+    return dependants - set(file_names)
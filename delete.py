@@ -1,15 +1,37 @@
-from qdrant_client import QdrantClient
+import argparse
 
-def delete_all_collections():
-    """Connecte à Qdrant et supprime toutes les collections."""
-    client = QdrantClient(url="http://localhost:6333")  # Connexion à Qdrant
+from indexall_minilm import QDRANT_URL, connect_to_qdrant
+from snapshots import creer_snapshot
+
+def delete_all_collections(snapshot=None, url=QDRANT_URL):
+    """Connecte à Qdrant et supprime toutes les collections, après un snapshot de chacune si `snapshot`.
+
+    Avec `snapshot=None`, la question est posée pour chaque collection.
+    """
+    client = connect_to_qdrant(url=url)  # Connexion à Qdrant
     collections = client.get_collections().collections  # Récupérer toutes les collections
-    
+
     for col in collections:
+        sauvegarder = snapshot
+        if sauvegarder is None:
+            reponse = input(f"📸 Créer un snapshot de '{col.name}' avant de la supprimer ? [O/n] ")
+            sauvegarder = reponse.strip().lower() not in ("n", "non")
+        if sauvegarder:
+            creer_snapshot(client, col.name, url)  # Restaurable avec : python snapshots.py restaurer
         client.delete_collection(col.name)  # Supprimer chaque collection
         print(f"Collection '{col.name}' supprimée.")
 
     print("Toutes les collections ont été supprimées.")
 
 if __name__ == "__main__":
-    delete_all_collections()
+    parser = argparse.ArgumentParser(description="Supprime toutes les collections du serveur Qdrant.")
+    choix = parser.add_mutually_exclusive_group()
+    choix.add_argument("--snapshot", action="store_true", help="Sauvegarde chaque collection sans demander")
+    choix.add_argument("--sans-snapshot", action="store_true", help="Supprime sans sauvegarde ni question")
+    parser.add_argument("--url", default=QDRANT_URL, help="Serveur Qdrant (défaut : QDRANT_URL)")
+    args = parser.parse_args()
+
+    snapshot = None
+    if args.snapshot or args.sans_snapshot:
+        snapshot = args.snapshot
+    delete_all_collections(snapshot=snapshot, url=args.url)
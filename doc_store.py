@@ -0,0 +1,179 @@
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+# Dossier des stores de documents (un sous-dossier par collection)
+DOC_STORE_DIR = ".doc_store"
+
+# Taille (en caractères) des blocs compressés indépendamment
+TAILLE_BLOC = 16384
+
+# Nombre de blocs décompressés gardés en mémoire
+BLOCS_EN_CACHE = 256
+
+
+class DocStore:
+    """Store local du texte nettoyé des documents, stocké une seule fois et compressé.
+
+    Chaque document est découpé en blocs de `TAILLE_BLOC` caractères compressés
+    indépendamment (zlib) et ajoutés à `texts.bin`, lu par memory-map. Le
+    fichier `index.json` associe à chaque `doc_id` la liste de ses blocs. Un
+    chunk se relit à partir de (doc_id, début, fin) en ne décompressant que
+    les blocs qu'il recouvre.
+    """
+
+    def __init__(self, collection_name, dossier=DOC_STORE_DIR):
+        self.dossier = os.path.join(dossier, collection_name)
+        self.chemin_textes = os.path.join(self.dossier, "texts.bin")
+        self.chemin_index = os.path.join(self.dossier, "index.json")
+        self.lock = threading.Lock()
+        self.index = {}
+        self.index_mtime = None
+        self._mmap = None
+        self._taille_mmap = 0
+        self._blocs = OrderedDict()
+        self._charger_index()
+
+    def _charger_index(self):
+        """Recharge l'index s'il a été modifié sur disque (ex. par un run d'indexation)."""
+        try:
+            mtime = os.stat(self.chemin_index).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.index_mtime:
+            return
+        with open(self.chemin_index, encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.index_mtime = mtime
+        # Le fichier de textes a pu être compacté entre-temps : les positions ont changé
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._blocs.clear()
+
+    def _sauvegarder_index(self):
+        tmp = self.chemin_index + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.chemin_index)
+        self.index_mtime = os.stat(self.chemin_index).st_mtime_ns
+
+    def contient(self, doc_id):
+        """Indique si le texte d'un document est déjà stocké."""
+        return doc_id in self.index
+
+    def ajouter(self, doc_id, texte):
+        """Stocke le texte d'un document (sans effet s'il est déjà présent)."""
+        with self.lock:
+            if doc_id in self.index:
+                return
+            os.makedirs(self.dossier, exist_ok=True)
+            blocs = []
+            with open(self.chemin_textes, "ab") as f:
+                position = f.tell()
+                for debut in range(0, len(texte), TAILLE_BLOC):
+                    donnees = zlib.compress(texte[debut:debut + TAILLE_BLOC].encode("utf-8"), 6)
+                    f.write(donnees)
+                    blocs.append([position, len(donnees)])
+                    position += len(donnees)
+            self.index[doc_id] = {"longueur": len(texte), "blocs": blocs}
+            self._sauvegarder_index()
+
+    def _lire_bloc(self, doc_id, numero):
+        """Retourne un bloc décompressé, en passant par le cache LRU."""
+        cle = (doc_id, numero)
+        if cle in self._blocs:
+            self._blocs.move_to_end(cle)
+            return self._blocs[cle]
+
+        position, longueur = self.index[doc_id]["blocs"][numero]
+        if self._mmap is None or position + longueur > self._taille_mmap:
+            # Le fichier a grandi depuis la dernière projection : on la refait
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self.chemin_textes, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._taille_mmap = len(self._mmap)
+
+        bloc = zlib.decompress(self._mmap[position:position + longueur]).decode("utf-8")
+        self._blocs[cle] = bloc
+        if len(self._blocs) > BLOCS_EN_CACHE:
+            self._blocs.popitem(last=False)
+        return bloc
+
+    def hydrater(self, refs):
+        """Relit en un seul passage le texte de plusieurs chunks donnés par (doc_id, début, fin).
+
+        Les blocs partagés par plusieurs chunks ne sont décompressés qu'une fois.
+        Retourne None pour les références introuvables.
+        """
+        with self.lock:
+            self._charger_index()
+            textes = []
+            for doc_id, debut, fin in refs:
+                if doc_id not in self.index:
+                    textes.append(None)
+                    continue
+                premier, dernier = debut // TAILLE_BLOC, max(debut, fin - 1) // TAILLE_BLOC
+                morceau = "".join(self._lire_bloc(doc_id, i) for i in range(premier, dernier + 1))
+                decalage = premier * TAILLE_BLOC
+                textes.append(morceau[debut - decalage:fin - decalage])
+            return textes
+
+    def compacter(self, doc_ids_a_garder):
+        """Réécrit le store en ne conservant que les documents encore indexés."""
+        with self.lock:
+            self._charger_index()
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._blocs.clear()
+
+            nouvel_index = {}
+            tmp = self.chemin_textes + ".tmp"
+            with open(self.chemin_textes, "rb") as source, open(tmp, "wb") as cible:
+                for doc_id in doc_ids_a_garder:
+                    entree = self.index.get(doc_id)
+                    if entree is None:
+                        continue
+                    blocs = []
+                    for position, longueur in entree["blocs"]:
+                        source.seek(position)
+                        blocs.append([cible.tell(), longueur])
+                        cible.write(source.read(longueur))
+                    nouvel_index[doc_id] = {"longueur": entree["longueur"], "blocs": blocs}
+            os.replace(tmp, self.chemin_textes)
+            self.index = nouvel_index
+            self._sauvegarder_index()
+
+
+def offsets_chunks(texte, chunks):
+    """Retrouve la position (début, fin) de chaque chunk dans le texte du document.
+
+    Les chunks sont des sous-chaînes du texte, dans l'ordre ; la recherche
+    repart de la position du chunk précédent.
+    """
+    offsets = []
+    position = 0
+    for chunk in chunks:
+        debut = texte.find(chunk, position)
+        if debut < 0:
+            raise ValueError("Chunk introuvable dans le texte du document.")
+        offsets.append((debut, debut + len(chunk)))
+        position = debut + 1
+    return offsets
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_doc_store(collection_name):
+    """Retourne le store de documents (partagé) d'une collection."""
+    with _stores_lock:
+        if collection_name not in _stores:
+            _stores[collection_name] = DocStore(collection_name)
+        return _stores[collection_name]
@@ -0,0 +1,155 @@
+import os
+
+import numpy as np
+
+from embedding_cache import CACHE_ACTIF, EmbeddingCache
+from embedding_pool import get_pool
+from lazy import LazySingleton
+from onnx_backend import EMBEDDING_BACKEND, get_onnx_encoder, identifiant_backend
+
+# Nombre de threads intra-op de PyTorch (0 : choix par défaut de torch)
+TORCH_THREADS = int(os.getenv("EMBEDDING_TORCH_THREADS", "0"))
+
+# Nombre maximal de tokens (remplissage compris) par passe avant, pour les encodeurs [CLS]
+TOKENS_PAR_LOT = int(os.getenv("EMBEDDING_TOKENS_PAR_LOT", "8192"))
+
+
+class EmbeddingBackend:
+    """Encodeur de phrases du projet, avec une API par lots.
+
+    `nom` est aussi le nom du vecteur Qdrant (named vector) qu'il alimente.
+    Le tokenizer, le modèle et le cache d'embeddings ne sont chargés qu'au
+    premier usage. `pooling="mean"` passe par SentenceTransformer (MiniLM),
+    `pooling="cls"` prend le token [CLS] du modèle Transformers (SapBERT) ;
+    avec EMBEDDING_BACKEND=onnx, les deux passent par ONNX Runtime.
+    Pendant une indexation avec un pool d'encodage (`pool_embedding`), les
+    passes du modèle sont réparties sur les processus du pool.
+    """
+
+    def __init__(self, nom, model_name, dim, pooling, max_tokens, batch_size=64):
+        self.nom = nom
+        self.model_name = model_name
+        self.dim = dim
+        self.pooling = pooling
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.get_tokenizer = LazySingleton(self._charger_tokenizer)
+        self.get_model = LazySingleton(self._charger_modele)
+        self.get_cache = LazySingleton(self._ouvrir_cache)
+
+    def _charger_tokenizer(self):
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+
+    def _charger_modele(self):
+        if TORCH_THREADS:
+            import torch
+
+            torch.set_num_threads(TORCH_THREADS)
+        if self.pooling == "mean":
+            from sentence_transformers import SentenceTransformer
+
+            return SentenceTransformer(self.model_name)
+        from transformers import AutoModel
+
+        return AutoModel.from_pretrained(self.model_name).eval()
+
+    def _ouvrir_cache(self):
+        return EmbeddingCache(identifiant_backend(self.model_name), self.dim) if CACHE_ACTIF else None
+
+    def encode_modele(self, textes, batch_size):
+        """Encode des textes avec le modèle, sans passer par le cache, et retourne une matrice float32."""
+        pool = get_pool()
+        if pool is not None:
+            return pool.encode(self.nom, textes, batch_size)
+        if EMBEDDING_BACKEND == "onnx":
+            encodeur = get_onnx_encoder(self.model_name, self.pooling, self.max_tokens)
+            return encodeur.encode(list(textes), batch_size=batch_size)
+        if self.pooling == "mean":
+            return self.get_model().encode(list(textes), batch_size=batch_size, convert_to_numpy=True,
+                                           show_progress_bar=False)
+        return self._encoder_cls(textes, batch_size)
+
+    def _encoder_cls(self, textes, batch_size):
+        """Encode par lots de longueurs voisines, chaque lot n'étant complété que jusqu'à son plus long texte.
+
+        Les textes sont tokenisés une seule fois, triés par nombre de tokens
+        décroissant puis regroupés par lots d'au plus `batch_size` textes et
+        `TOKENS_PAR_LOT` tokens une fois complétés. Les vecteurs [CLS] sont
+        rangés dans l'ordre d'origine.
+        """
+        import torch
+
+        tokenizer, model = self.get_tokenizer(), self.get_model()
+        encodages = tokenizer(list(textes), truncation=True, max_length=self.max_tokens, verbose=False)
+        ids = encodages["input_ids"]
+        ordre = sorted(range(len(ids)), key=lambda i: len(ids[i]), reverse=True)
+
+        vecteurs = np.empty((len(ids), self.dim), dtype=np.float32)
+        with torch.inference_mode():
+            debut = 0
+            while debut < len(ordre):
+                # Le premier texte du lot est le plus long : il fixe la longueur complétée
+                longueur = len(ids[ordre[debut]])
+                taille = max(1, min(batch_size, TOKENS_PAR_LOT // longueur))
+                lot = ordre[debut:debut + taille]
+                entrees = tokenizer.pad(
+                    {cle: [encodages[cle][i] for i in lot] for cle in encodages.keys()}, return_tensors="pt"
+                )
+                vecteurs[lot] = model(**entrees).last_hidden_state[:, 0, :].float().numpy()
+                debut += taille
+        return vecteurs
+
+    def compter_tokens(self, textes):
+        """Nombre total de tokens vus par le modèle pour ces textes (tokens spéciaux compris, après troncature)."""
+        encodages = self.get_tokenizer()(list(textes), truncation=True, max_length=self.max_tokens, verbose=False)
+        return sum(len(ids) for ids in encodages["input_ids"])
+
+    def encode(self, texts, batch_size=None):
+        """Encode une liste de textes par lots, en consultant d'abord le cache d'embeddings.
+
+        Retourne une matrice float32 de forme (len(texts), dim).
+        """
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+        cache = self.get_cache()
+        if cache is None:
+            return np.ascontiguousarray(self.encode_modele(list(texts), batch_size), dtype=np.float32)
+        return cache.encode(list(texts), lambda textes: self.encode_modele(textes, batch_size))
+
+
+# Registre des encodeurs disponibles, par nom de vecteur
+BACKENDS = {}
+
+
+def enregistrer_backend(backend):
+    """Ajoute un encodeur au registre."""
+    BACKENDS[backend.nom] = backend
+    return backend
+
+
+def get_backend(nom):
+    """Retourne l'encodeur enregistré sous ce nom."""
+    try:
+        return BACKENDS[nom]
+    except KeyError:
+        raise ValueError(f"Encodeur inconnu : {nom!r} (disponibles : {', '.join(sorted(BACKENDS))}).") from None
+
+
+def encode_vecteurs(texts, vectors, batch_size=None):
+    """Encode des textes avec plusieurs encodeurs et retourne {nom du vecteur: matrice float32}.
+
+    La ligne i de chaque matrice est le vecteur nommé du texte i, au format
+    attendu par `upload_collection` pour une collection à vecteurs nommés.
+    """
+    return {nom: get_backend(nom).encode(texts, batch_size) for nom in vectors}
+
+
+enregistrer_backend(EmbeddingBackend(
+    "minilm", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", dim=384, pooling="mean", max_tokens=128
+))
+enregistrer_backend(EmbeddingBackend(
+    "sapbert", "cambridgeltl/SapBERT-from-PubMedBERT-fulltext", dim=768, pooling="cls", max_tokens=512
+))
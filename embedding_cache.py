@@ -0,0 +1,219 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+import numpy as np
+
+# Dossier racine du cache (un sous-dossier par modèle)
+CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+
+# Nombre maximal d'embeddings conservés par modèle
+CACHE_CAPACITE = int(os.getenv("EMBEDDING_CACHE_CAPACITE", "200000"))
+
+# Type de stockage des vecteurs : float32 (exact) ou float16 (deux fois plus compact)
+CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+
+# Mettre EMBEDDING_CACHE=0 pour désactiver le cache
+CACHE_ACTIF = os.getenv("EMBEDDING_CACHE", "1") != "0"
+
+# Proportion des entrées les moins récemment utilisées évincées quand le cache est plein
+PART_EVICTION = 0.1
+
+INDEX_DTYPE = np.dtype([("cle", "S32"), ("tick", "<i8")])
+
+# En-tête partagé (`entete.bin`) : génération de l'index (insertions, évictions) et compteur d'utilisation
+GENERATION, TICK = 0, 1
+
+
+def normaliser_texte(text):
+    """Normalise un texte (Unicode NFC, espaces) avant de le hacher."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cle_texte(model_id, text):
+    """Retourne la clé de cache (hash hexadécimal de 32 caractères) d'un texte pour un modèle donné."""
+    contenu = f"{model_id}\0{normaliser_texte(text)}".encode("utf-8")
+    return hashlib.blake2b(contenu, digest_size=16).hexdigest().encode("ascii")
+
+
+class EmbeddingCache:
+    """Cache persistant d'embeddings indexé par (modèle, hash du texte normalisé).
+
+    Les vecteurs sont stockés dans un tableau memory-mappé (`vectors.bin`) et
+    les clés dans un fichier d'index memory-mappé (`index.bin`) qui associe
+    chaque emplacement à une clé et à un compteur d'utilisation. Quand le
+    cache est plein, les entrées les moins récemment utilisées sont évincées.
+
+    Plusieurs processus (indexeur, indexation Streamlit, pool d'encodage)
+    peuvent partager le même cache : les accès passent par un verrou de
+    fichier, et la table clé → emplacement n'est relue que si un autre
+    processus a inséré ou évincé des entrées (génération de l'en-tête) ;
+    un hit ne fait avancer que le compteur d'utilisation partagé.
+    """
+
+    def __init__(self, model_id, dim, cache_dir=CACHE_DIR, capacite=CACHE_CAPACITE, dtype=CACHE_DTYPE):
+        self.model_id = model_id
+        self.dim = dim
+        self.capacite = capacite
+        self.dtype = np.dtype(dtype)
+        self.dossier = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_id))
+        self.lock = threading.Lock()
+        self.chemin_verrou = self.dossier + ".lock"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._verrouiller():
+            self._ouvrir()
+
+    @contextmanager
+    def _verrouiller(self):
+        """Verrou exclusif entre threads (verrou Python) et entre processus (flock sur un fichier voisin)."""
+        with self.lock, open(self.chemin_verrou, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _ouvrir(self):
+        """Ouvre (ou crée) les fichiers du cache et reconstruit la table clé → emplacement."""
+        meta = {"model_id": self.model_id, "dim": self.dim, "capacite": self.capacite, "dtype": self.dtype.name}
+        chemin_meta = os.path.join(self.dossier, "meta.json")
+
+        try:
+            with open(chemin_meta, encoding="utf-8") as f:
+                meta_existante = json.load(f)
+        except (OSError, ValueError):
+            meta_existante = None
+
+        if meta_existante != meta:
+            # Paramètres différents (ou cache absent) : on repart d'un cache vide
+            shutil.rmtree(self.dossier, ignore_errors=True)
+            os.makedirs(self.dossier, exist_ok=True)
+            with open(chemin_meta, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        mode_vecteurs = "r+" if os.path.exists(os.path.join(self.dossier, "vectors.bin")) else "w+"
+        self.vecteurs = np.memmap(os.path.join(self.dossier, "vectors.bin"), dtype=self.dtype,
+                                  mode=mode_vecteurs, shape=(self.capacite, self.dim))
+        mode_index = "r+" if os.path.exists(os.path.join(self.dossier, "index.bin")) else "w+"
+        self.index = np.memmap(os.path.join(self.dossier, "index.bin"), dtype=INDEX_DTYPE,
+                               mode=mode_index, shape=(self.capacite,))
+
+        chemin_entete = os.path.join(self.dossier, "entete.bin")
+        nouvel_entete = not os.path.exists(chemin_entete)
+        self.entete = np.memmap(chemin_entete, dtype="<i8", mode="w+" if nouvel_entete else "r+", shape=(2,))
+        if nouvel_entete:
+            self.entete[TICK] = self.index["tick"].max()
+            self.entete.flush()
+
+        self._relire_index()
+
+    def _relire_index(self):
+        """Reconstruit la table clé → emplacement et la liste des emplacements libres depuis l'index."""
+        occupes = np.flatnonzero(self.index["cle"] != b"")
+        self.emplacements = {bytes(self.index["cle"][i]): int(i) for i in occupes}
+        self.libres = list(np.flatnonzero(self.index["cle"] == b"")[::-1])
+        self.generation = int(self.entete[GENERATION])
+
+    def _synchroniser(self):
+        """Relit l'index si un autre processus y a inséré ou évincé des entrées, et reprend le compteur partagé."""
+        if int(self.entete[GENERATION]) != self.generation:
+            self._relire_index()
+        self.tick = int(self.entete[TICK])
+
+    def _evincer(self, nombre):
+        """Libère les `nombre` emplacements les moins récemment utilisés."""
+        occupes = np.array(sorted(self.emplacements.values()))
+        nombre = min(max(nombre, 1), len(occupes))
+        anciens = occupes[np.argpartition(self.index["tick"][occupes], nombre - 1)[:nombre]]
+        for i in anciens:
+            del self.emplacements[bytes(self.index["cle"][i])]
+            self.index["cle"][i] = b""
+            self.libres.append(int(i))
+        self.evictions += nombre
+
+    def encode(self, texts, encode_fn):
+        """Retourne les embeddings de `texts` (matrice float32), en n'encodant que les textes absents du cache.
+
+        `encode_fn` reçoit la liste des textes manquants et retourne leurs
+        embeddings dans le même ordre.
+        """
+        cles = [cle_texte(self.model_id, t) for t in texts]
+        resultat = np.empty((len(texts), self.dim), dtype=np.float32)
+
+        with self._verrouiller():
+            self._synchroniser()
+            manquants = []
+            for i, cle in enumerate(cles):
+                slot = self.emplacements.get(cle)
+                if slot is None:
+                    manquants.append(i)
+                else:
+                    resultat[i] = self.vecteurs[slot]
+                    self.tick += 1
+                    self.index["tick"][slot] = self.tick
+            self.entete[TICK] = self.tick
+            self.hits += len(texts) - len(manquants)
+            self.misses += len(manquants)
+
+        if not manquants:
+            return resultat
+
+        # Un même texte peut apparaître plusieurs fois dans le lot : on ne l'encode qu'une fois
+        uniques = {}
+        for i in manquants:
+            uniques.setdefault(cles[i], i)
+        nouveaux = np.asarray(encode_fn([texts[i] for i in uniques.values()]), dtype=np.float32)
+        par_cle = dict(zip(uniques, nouveaux))
+        for i in manquants:
+            resultat[i] = par_cle[cles[i]]
+
+        with self._verrouiller():
+            self._synchroniser()
+            if len(self.libres) < len(par_cle):
+                self._evincer(max(len(par_cle) - len(self.libres), int(self.capacite * PART_EVICTION)))
+            for cle, vecteur in par_cle.items():
+                if cle in self.emplacements:
+                    continue
+                if not self.libres:
+                    break
+                slot = self.libres.pop()
+                self.tick += 1
+                # Le vecteur est écrit avant la clé : une interruption ne laisse jamais une clé sans vecteur
+                self.vecteurs[slot] = vecteur
+                self.index[slot] = (cle, self.tick)
+                self.emplacements[cle] = slot
+            self.vecteurs.flush()
+            self.index.flush()
+            # Publiée après l'index : les autres processus relisent une table complète
+            self.generation += 1
+            self.entete[:] = (self.generation, self.tick)
+            self.entete.flush()
+
+        return resultat
+
+    def stats(self):
+        """Retourne les statistiques d'utilisation du cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_hits": self.hits / total if total else 0.0,
+            "entrees": len(self.emplacements),
+            "capacite": self.capacite,
+            "evictions": self.evictions,
+        }
+
+    def afficher_stats(self):
+        """Affiche le taux de hits du cache."""
+        s = self.stats()
+        print(f"🗃️ Cache d'embeddings ({self.model_id}) : {s['hits']} hits / {s['misses']} misses "
+              f"({s['taux_hits']:.0%}), {s['entrees']}/{s['capacite']} entrées, {s['evictions']} évictions.")
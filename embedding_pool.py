@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+# Processus d'encodage pendant l'indexation : "auto" (selon les cœurs de la machine) ou un nombre (1 : pas de pool)
+EMBEDDING_WORKERS = os.getenv("EMBEDDING_WORKERS", "1")
+
+# Threads PyTorch / ONNX Runtime par processus en mode "auto" : au-delà, l'encodage d'un lot passe mal à l'échelle
+THREADS_PAR_WORKER = int(os.getenv("EMBEDDING_THREADS_PAR_WORKER", "4"))
+
+# Pool actif dans le processus principal (None : encodage dans le processus courant)
+_pool = None
+
+
+def coeurs_disponibles():
+    """Nombre de cœurs utilisables par le processus (affinité CPU comprise)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def repartition_auto(coeurs=None, threads_par_worker=THREADS_PAR_WORKER):
+    """Choisit le nombre de processus et de threads par processus pour occuper les cœurs de la machine.
+
+    Un processus garde au moins `threads_par_worker` threads ; en dessous de
+    deux processus possibles, un seul processus prend tous les cœurs.
+    """
+    coeurs = coeurs or coeurs_disponibles()
+    if coeurs < 2 * threads_par_worker:
+        return 1, coeurs
+    return coeurs // threads_par_worker, threads_par_worker
+
+
+def repartition(workers=EMBEDDING_WORKERS):
+    """Retourne (processus, threads par processus) pour `workers` ("auto" ou un nombre)."""
+    if str(workers) == "auto":
+        return repartition_auto()
+    workers = max(1, int(workers))
+    return workers, max(1, coeurs_disponibles() // workers)
+
+
+def _initialiser_worker(threads):
+    """Fixe le nombre de threads du processus avant le chargement des modèles."""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "EMBEDDING_TORCH_THREADS", "EMBEDDING_ONNX_THREADS"):
+        os.environ[variable] = str(threads)
+    # Le module principal a pu importer les encodeurs avant l'initialisation (démarrage en "spawn")
+    import embedding_backends
+    import onnx_backend
+
+    embedding_backends.TORCH_THREADS = threads
+    onnx_backend.ONNX_THREADS = threads
+
+
+def _encoder_worker(nom, textes, batch_size):
+    """Encode un sous-lot avec le modèle du processus (chargé au premier appel)."""
+    from embedding_backends import get_backend
+
+    return get_backend(nom).encode_modele(textes, batch_size)
+
+
+class PoolEmbedding:
+    """Processus d'encodage qui se partagent les sous-lots d'un même lot de textes.
+
+    Chaque processus charge ses propres modèles et n'utilise que `threads`
+    threads : plusieurs passes avant indépendantes passent mieux à l'échelle
+    sur une machine à nombreux cœurs qu'une seule passe sur tous les cœurs.
+    Un lot est découpé en sous-lots de `batch_size` textes, déposés dans la
+    file commune du pool ; les résultats sont réassemblés dans l'ordre des
+    textes, quel que soit le processus qui a encodé chaque sous-lot.
+    Les processus sont démarrés en "spawn" : un fork après l'initialisation
+    d'OpenMP dans le processus principal peut bloquer PyTorch.
+    """
+
+    def __init__(self, workers, threads):
+        self.workers = workers
+        self.threads = threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialiser_worker,
+            initargs=(threads,)
+        )
+
+    def encode(self, nom, textes, batch_size):
+        """Encode des textes avec l'encodeur `nom` et retourne une matrice float32 dans l'ordre des textes."""
+        textes = list(textes)
+        sous_lots = [textes[i:i + batch_size] for i in range(0, len(textes), batch_size)]
+        matrices = self.executor.map(_encoder_worker, [nom] * len(sous_lots), sous_lots, [batch_size] * len(sous_lots))
+        return np.ascontiguousarray(np.concatenate(list(matrices)), dtype=np.float32)
+
+    def fermer(self):
+        self.executor.shutdown()
+
+
+def get_pool():
+    """Retourne le pool actif du processus, ou None."""
+    return _pool
+
+
+@contextmanager
+def pool_embedding(workers=EMBEDDING_WORKERS):
+    """Active un pool d'encodage le temps d'une indexation ; ne fait rien pour un seul processus.
+
+    Produit la répartition (processus, threads par processus) retenue.
+    """
+    global _pool
+    nombre, threads = repartition(workers)
+    if _pool is not None:
+        yield _pool.workers, _pool.threads
+        return
+    if nombre <= 1:
+        yield nombre, threads
+        return
+    _pool = PoolEmbedding(nombre, threads)
+    print(f"🧵 Pool d'encodage : {nombre} processus x {threads} threads.")
+    try:
+        yield nombre, threads
+    finally:
+        pool, _pool = _pool, None
+        pool.fermer()
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+from qdrant_client import QdrantClient
+
+from collection_versions import basculer_alias, resoudre_alias
+from doc_store import get_doc_store
+from embedding_backends import BACKENDS
+from index_manifest import charger_manifest, sauvegarder_manifest
+from indexall_minilm import (
+    COLLECTION_NAME,
+    QDRANT_URL,
+    chargement_en_masse,
+    connect_to_qdrant,
+    create_collection
+)
+from ingestion_pipeline import ecrire_lot
+
+# Points lus par page de scroll, et donc lignes par record batch du fichier
+LIGNES_PAR_BATCH = 1024
+
+# Colonnes de payload exportées telles quelles ; le reste du payload est gardé en JSON
+COLONNES_PAYLOAD = ("file_name", "chunk_number", "chunk_text")
+
+# Clé des métadonnées de l'index dans le schéma Arrow
+CLE_METADONNEES = b"index"
+
+
+def colonne_vecteur(nom):
+    """Nom de la colonne d'un vecteur nommé (ou du vecteur unique d'une collection sans vecteurs nommés)."""
+    return f"vecteur:{nom}" if nom else "vecteur"
+
+
+def config_vecteurs(client, collection_name):
+    """Retourne {nom du vecteur (None si vecteur unique): dimension} d'après la configuration de la collection."""
+    vecteurs = client.get_collection(collection_name).config.params.vectors
+    if isinstance(vecteurs, dict):
+        return {nom: params.size for nom, params in vecteurs.items()}
+    return {None: vecteurs.size}
+
+
+def modele_du_vecteur(nom):
+    """Modèle d'un vecteur nommé d'après le registre ; le vecteur unique des anciennes collections vient de MiniLM."""
+    backend = BACKENDS.get(nom or "minilm")
+    return backend.model_name if backend else None
+
+
+def _batch(points, dims, dtype, textes):
+    """Construit un record batch à partir d'une page de points : une colonne par vecteur, puis les payloads."""
+    colonnes = {"id": pa.array([str(p.id) for p in points], pa.string())}
+    for nom, dim in dims.items():
+        lignes = [p.vector[nom] if nom else p.vector for p in points]
+        valeurs = pa.array(np.asarray(lignes, dtype=dtype).reshape(-1))
+        colonnes[colonne_vecteur(nom)] = pa.FixedSizeListArray.from_arrays(valeurs, dim)
+    colonnes["file_name"] = pa.array([p.payload.get("file_name") for p in points], pa.string())
+    colonnes["chunk_number"] = pa.array([p.payload.get("chunk_number") for p in points], pa.int32())
+    colonnes["chunk_text"] = pa.array(textes, pa.string())
+    colonnes["payload"] = pa.array([
+        json.dumps({cle: valeur for cle, valeur in p.payload.items() if cle not in COLONNES_PAYLOAD}, ensure_ascii=False)
+        for p in points
+    ], pa.string())
+    return pa.RecordBatch.from_pydict(colonnes)
+
+
+def exporter(client, nom, chemin, dtype="float32", lignes_par_batch=LIGNES_PAR_BATCH):
+    """Exporte une collection (ou la version active d'un alias) dans un fichier Arrow IPC en colonnes.
+
+    Chaque vecteur est une colonne de listes de taille fixe (float32 ou
+    float16), à côté des colonnes `file_name`, `chunk_number`, `chunk_text`
+    et du reste du payload en JSON. Les chunks stockés par offsets dans le
+    store de documents sont relus pour que le fichier se suffise à lui-même.
+    Les métadonnées du schéma décrivent les vecteurs (dimension, modèle), les
+    paramètres de chunking et le manifest d'indexation. L'export lit la
+    collection page par page : la mémoire ne dépend pas de sa taille.
+    """
+    debut = time.perf_counter()
+    collection_name = resoudre_alias(client, nom) or nom
+    dims = config_vecteurs(client, collection_name)
+    manifest = charger_manifest(collection_name)
+    entrees = list(manifest["files"].values())
+    metadonnees = {
+        "collection": collection_name,
+        "dtype": dtype,
+        "vecteurs": {nom_vecteur or "": {"dim": dim, "model": modele_du_vecteur(nom_vecteur)}
+                     for nom_vecteur, dim in dims.items()},
+        "parametres": entrees[0].get("params") if entrees else None,
+        "manifest": manifest,
+    }
+
+    nombre = 0
+    offset = None
+    tmp = chemin + ".tmp"
+    writer = None
+    try:
+        while True:
+            points, offset = client.scroll(collection_name, limit=lignes_par_batch, offset=offset,
+                                           with_payload=True, with_vectors=True)
+            if points:
+                textes = [p.payload.get("chunk_text") for p in points]
+                a_hydrater = [i for i, texte in enumerate(textes) if texte is None and "doc_id" in points[i].payload]
+                if a_hydrater:
+                    refs = [(points[i].payload["doc_id"], points[i].payload["start"], points[i].payload["end"])
+                            for i in a_hydrater]
+                    for i, texte in zip(a_hydrater, get_doc_store(collection_name).hydrater(refs)):
+                        textes[i] = texte
+                batch = _batch(points, dims, dtype, textes)
+                if writer is None:
+                    schema = batch.schema.with_metadata({CLE_METADONNEES: json.dumps(metadonnees, ensure_ascii=False)})
+                    writer = pa.ipc.new_file(tmp, schema)
+                writer.write_batch(batch)
+                nombre += len(points)
+            if offset is None:
+                break
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"La collection '{collection_name}' est vide : rien à exporter.")
+    os.replace(tmp, chemin)
+
+    print(f"📦 {nombre} points de '{collection_name}' exportés dans '{chemin}' "
+          f"({os.path.getsize(chemin) / 1e6:.1f} Mo, {dtype}) en {time.perf_counter() - debut:.1f}s.")
+    return nombre
+
+
+def lire_metadonnees(chemin):
+    """Retourne les métadonnées d'index d'un fichier exporté."""
+    with pa.memory_map(chemin, "r") as source:
+        return json.loads(pa.ipc.open_file(source).schema.metadata[CLE_METADONNEES])
+
+
+def compter_lignes(chemin):
+    """Nombre de points d'un fichier exporté (lu dans l'en-tête des record batches, sans les données)."""
+    with pa.memory_map(chemin, "r") as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def iter_lots(chemin):
+    """Parcourt un fichier exporté record batch par record batch, sans le charger en mémoire.
+
+    Le fichier est lu par memory-map : les vecteurs d'un batch sont des vues
+    sur le fichier (converties en float32 si besoin) et seules les pages lues
+    sont chargées par le système. Produit (ids, vecteurs, payloads), où
+    `vecteurs` est une matrice ou un dictionnaire de matrices par vecteur nommé.
+    """
+    with pa.memory_map(chemin, "r") as source:
+        reader = pa.ipc.open_file(source)
+        metadonnees = json.loads(reader.schema.metadata[CLE_METADONNEES])
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            vecteurs = {}
+            for nom, config in metadonnees["vecteurs"].items():
+                valeurs = batch.column(colonne_vecteur(nom)).flatten().to_numpy(zero_copy_only=False)
+                vecteurs[nom] = np.ascontiguousarray(valeurs.reshape(-1, config["dim"]), dtype=np.float32)
+            ids = [int(id_) if id_.isdigit() else id_ for id_ in batch.column("id").to_pylist()]
+            payloads = []
+            for file_name, chunk_number, chunk_text, reste in zip(*(batch.column(c).to_pylist()
+                                                                   for c in COLONNES_PAYLOAD + ("payload",))):
+                payload = json.loads(reste)
+                payload.update(file_name=file_name, chunk_number=chunk_number, chunk_text=chunk_text)
+                payloads.append(payload)
+            yield ids, vecteurs if "" not in vecteurs else vecteurs[""], payloads
+
+
+def importer(client, chemin, collection_name=None, alias=None, forcer=False):
+    """Charge un fichier exporté dans une nouvelle collection, en flux et en mode masse.
+
+    La collection est créée avec les vecteurs et dimensions décrits par les
+    métadonnées, sans indexation HNSW pendant le chargement
+    (`chargement_en_masse`). Une collection existante n'est complétée
+    qu'avec `forcer`. Le manifest d'indexation est restauré : l'indexation
+    incrémentale ne réencode pas les PDFs déjà présents. Avec `alias`,
+    l'alias est basculé vers la collection importée.
+    """
+    debut = time.perf_counter()
+    metadonnees = lire_metadonnees(chemin)
+    lignes = compter_lignes(chemin)
+    collection_name = collection_name or metadonnees["collection"]
+    dims = {nom: config["dim"] for nom, config in metadonnees["vecteurs"].items()}
+    if "" in dims:
+        creee = create_collection(client, collection_name, dims[""], bulk=True)
+    else:
+        creee = create_collection(client, collection_name, vectors=dims, bulk=True)
+    if not creee and not forcer:
+        raise ValueError(f"La collection '{collection_name}' existe déjà : choisir un autre nom ou forcer l'import.")
+
+    nombre = 0
+    with chargement_en_masse(client, collection_name):
+        precedent = None
+        for lot in iter_lots(chemin):
+            if precedent is not None:
+                ecrire_lot(client, collection_name, (*precedent, []))
+            precedent = lot
+            nombre += len(lot[0])
+        # Dernier lot avec wait=True : barrière, Qdrant applique les écritures dans l'ordre
+        if precedent is not None:
+            ecrire_lot(client, collection_name, (*precedent, []), attendre=True)
+
+    total = client.count(collection_name=collection_name, exact=True).count
+    if total < lignes or (creee and total != lignes):
+        raise ValueError(f"'{collection_name}' contient {total} points après import, {lignes} attendus.")
+
+    if metadonnees.get("manifest"):
+        sauvegarder_manifest(collection_name, metadonnees["manifest"])
+    if alias:
+        basculer_alias(client, alias, collection_name)
+    print(f"📥 {nombre} points importés dans '{collection_name}' en {time.perf_counter() - debut:.1f}s.")
+    return collection_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export / import d'un index en colonnes (Arrow IPC).")
+    parser.add_argument("action", choices=["exporter", "importer", "info"])
+    parser.add_argument("fichier", help="Fichier .arrow")
+    parser.add_argument("--collection", help=f"Collection ou alias exporté (défaut : {COLLECTION_NAME}) ; "
+                                             f"collection créée à l'import (défaut : celle du fichier)")
+    parser.add_argument("--alias", help="Alias à faire pointer vers la collection importée")
+    parser.add_argument("--forcer", action="store_true", help="Importe aussi dans une collection existante")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="Précision des vecteurs dans le fichier")
+    parser.add_argument("--url", default=QDRANT_URL)
+    parser.add_argument("--path", help="Importe dans une instance Qdrant locale (embarquée) plutôt qu'un serveur")
+    args = parser.parse_args()
+
+    if args.action == "info":
+        metadonnees = lire_metadonnees(args.fichier)
+        print(f"Collection : {metadonnees['collection']} ({metadonnees['dtype']})")
+        for nom, config in metadonnees["vecteurs"].items():
+            print(f"  {colonne_vecteur(nom)} : {config['dim']} dimensions, modèle {config['model']}")
+        print(f"Paramètres : {metadonnees['parametres']}")
+        print(f"Fichiers indexés : {len(metadonnees['manifest']['files'])}")
+    else:
+        client = QdrantClient(path=args.path) if args.path else connect_to_qdrant(url=args.url)
+        if args.action == "exporter":
+            exporter(client, args.collection or COLLECTION_NAME, args.fichier, args.dtype)
+        else:
+            importer(client, args.fichier, args.collection, args.alias, args.forcer)
@@ -0,0 +1,165 @@
+import hashlib
+import inspect
+import os
+import shutil
+import threading
+import zlib
+
+import pymupdf  # PyMuPDF
+
+import pdf_extraction
+from index_manifest import hash_fichier
+
+# Dossier du cache des textes extraits (un sous-dossier par version des règles de nettoyage)
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", ".extraction_cache")
+
+# Mettre EXTRACTION_CACHE=0 pour toujours relire les PDFs
+EXTRACTION_CACHE_ACTIF = os.getenv("EXTRACTION_CACHE", "1") != "0"
+
+
+def empreinte_nettoyage():
+    """Empreinte des règles d'extraction et de nettoyage (code source et version de PyMuPDF).
+
+    Toute modification de `nettoyer_pages` ou de la lecture des pages (chemin
+    parallèle, assemblage des plages, extraction série et de secours) change
+    l'empreinte, et donc le sous-dossier du cache : les anciennes entrées ne
+    sont plus lues.
+    """
+    fonctions = (pdf_extraction.nettoyer_pages, pdf_extraction._extraire_pages, pdf_extraction._assembler,
+                 pdf_extraction.extract_text_from_pdf)
+    sources = [inspect.getsource(fonction) for fonction in fonctions]
+    sources.append(str(getattr(pymupdf, "VersionBind", "")))
+    return hashlib.sha256("\0".join(sources).encode("utf-8")).hexdigest()[:16]
+
+
+class ExtractionCache:
+    """Cache persistant des paragraphes nettoyés d'un PDF, indexé par le hash de son contenu.
+
+    Chaque document occupe un fichier `<sha256>.zlib` : ses paragraphes
+    (qui ne contiennent jamais de saut de ligne après nettoyage) joints par
+    "\\n" puis compressés. Les documents vides ou illisibles ne sont pas mis
+    en cache.
+    """
+
+    def __init__(self, dossier=EXTRACTION_CACHE_DIR):
+        self.empreinte = empreinte_nettoyage()
+        self.dossier = os.path.join(dossier, self.empreinte)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._purger_versions(dossier)
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def _purger_versions(self, dossier):
+        """Supprime les entrées produites avec d'autres règles de nettoyage."""
+        if not os.path.isdir(dossier):
+            return
+        for nom in os.listdir(dossier):
+            if nom != self.empreinte:
+                shutil.rmtree(os.path.join(dossier, nom), ignore_errors=True)
+
+    def _chemin(self, file_hash):
+        return os.path.join(self.dossier, f"{file_hash}.zlib")
+
+    def contient(self, file_hash):
+        """Indique si les paragraphes d'un document sont en cache."""
+        return os.path.exists(self._chemin(file_hash))
+
+    def lire(self, file_hash):
+        """Retourne les paragraphes en cache d'un document, ou None s'il est absent."""
+        try:
+            with open(self._chemin(file_hash), "rb") as f:
+                donnees = f.read()
+            paragraphes = zlib.decompress(donnees).decode("utf-8").split("\n")
+        except FileNotFoundError:
+            paragraphes = None
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            print(f"⚠️ Entrée du cache d'extraction illisible, ignorée : {e}")
+            paragraphes = None
+        self._compter(paragraphes is not None)
+        return paragraphes
+
+    def _compter(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def ecrire(self, file_hash, paragraphes):
+        """Stocke les paragraphes d'un document (écriture atomique)."""
+        if not paragraphes:
+            return
+        chemin = self._chemin(file_hash)
+        tmp = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress("\n".join(paragraphes).encode("utf-8"), 6))
+        os.replace(tmp, chemin)
+
+    def afficher_stats(self):
+        total = self.hits + self.misses
+        if total:
+            print(f"📄 Cache d'extraction : {self.hits}/{total} PDFs relus depuis le cache.")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """Retourne le cache d'extraction (partagé), ou None s'il est désactivé."""
+    global _cache
+    if not EXTRACTION_CACHE_ACTIF:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
+
+
+def extract_text_cached(pdf_path, file_hash=None):
+    """Comme `extract_text_from_pdf`, en passant par le cache d'extraction."""
+    cache = get_extraction_cache()
+    if cache is None:
+        return pdf_extraction.extract_text_from_pdf(pdf_path)
+    file_hash = file_hash or hash_fichier(pdf_path)
+    paragraphes = cache.lire(file_hash)
+    if paragraphes is None:
+        paragraphes = pdf_extraction.extract_text_from_pdf(pdf_path)
+        cache.ecrire(file_hash, paragraphes)
+    return paragraphes
+
+
+def iter_extract_cached(pdf_paths, hashes=None, max_workers=None):
+    """Comme `iter_extract_parallel`, sans réouvrir les PDFs déjà présents dans le cache.
+
+    `hashes` associe à un chemin le hash de contenu déjà calculé du fichier
+    (sinon il est calculé ici). Seuls les PDFs absents du cache passent par le
+    pool d'extraction ; les couples (pdf_path, paragraphes) restent produits
+    dans l'ordre de `pdf_paths`.
+    """
+    pdf_paths = list(pdf_paths)
+    cache = get_extraction_cache()
+    if cache is None:
+        yield from pdf_extraction.iter_extract_parallel(pdf_paths, max_workers=max_workers)
+        return
+
+    hashes = hashes or {}
+    empreintes = {pdf_path: hashes.get(pdf_path) or hash_fichier(pdf_path) for pdf_path in pdf_paths}
+    a_extraire = [pdf_path for pdf_path in pdf_paths if not cache.contient(empreintes[pdf_path])]
+    extraits = pdf_extraction.iter_extract_parallel(a_extraire, max_workers=max_workers)
+    manquants = set(a_extraire)
+
+    # Les entrées en cache ne sont relues qu'au moment d'être produites, pour borner la mémoire
+    for pdf_path in pdf_paths:
+        if pdf_path in manquants:
+            _, paragraphes = next(extraits)
+            cache._compter(False)
+            cache.ecrire(empreintes[pdf_path], paragraphes)
+        else:
+            paragraphes = cache.lire(empreintes[pdf_path])
+            if paragraphes is None:
+                # Entrée disparue ou illisible entre-temps
+                paragraphes = pdf_extraction.extract_text_from_pdf(pdf_path)
+                cache.ecrire(empreintes[pdf_path], paragraphes)
+        yield pdf_path, paragraphes
@@ -0,0 +1,108 @@
+import json
+import os
+import uuid
+
+# Dossier des checkpoints d'indexation (un fichier JSON par collection)
+CHECKPOINT_DIR = ".index_checkpoints"
+
+# Espace de noms fixe : un même chunk obtient toujours le même identifiant
+NAMESPACE_CHUNKS = uuid.UUID("5b8f0a52-3c1e-4d6a-9f0e-7a2d41c9e6b3")
+
+
+def cle_index(file_hash, taille_chunk, chevauchement, unite="mots", dedup=False):
+    """Identifie une version indexée d'un fichier (contenu, paramètres de chunking, déduplication)."""
+    cle = f"{file_hash}:{taille_chunk}:{chevauchement}"
+    if unite != "mots":
+        cle = f"{file_hash}:{unite}:{taille_chunk}:{chevauchement}"
+    # Avec la déduplication, un fichier n'a pas les mêmes points : ceux d'un run sans déduplication sont effacés
+    return f"{cle}:dedup" if dedup else cle
+
+
+def point_id(file_hash, taille_chunk, chevauchement, chunk_number, unite="mots", dedup=False):
+    """Dérive un identifiant de point déterministe, pour des upserts idempotents."""
+    cle = f"{cle_index(file_hash, taille_chunk, chevauchement, unite, dedup)}:{chunk_number}"
+    return str(uuid.uuid5(NAMESPACE_CHUNKS, cle))
+
+
+def chemin_checkpoint(collection_name):
+    """Retourne le chemin du checkpoint associé à une collection."""
+    return os.path.join(CHECKPOINT_DIR, f"{collection_name}.json")
+
+
+def charger_checkpoint(collection_name, parametres):
+    """Charge le checkpoint d'un run interrompu, s'il a été produit avec les mêmes paramètres."""
+    try:
+        with open(chemin_checkpoint(collection_name), encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return nouveau_checkpoint(parametres)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Checkpoint de '{collection_name}' illisible, ignoré : {e}")
+        return nouveau_checkpoint(parametres)
+
+    if checkpoint.get("params") != parametres:
+        print(f"⚠️ Checkpoint de '{collection_name}' produit avec d'autres paramètres, ignoré.")
+        return nouveau_checkpoint(parametres)
+
+    return checkpoint
+
+
+def nouveau_checkpoint(parametres):
+    """Retourne un checkpoint vide."""
+    return {"params": parametres, "fichiers": {}}
+
+
+def sauvegarder_checkpoint(collection_name, checkpoint):
+    """Écrit le checkpoint de manière atomique (fichier temporaire puis renommage)."""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    chemin = chemin_checkpoint(collection_name)
+    tmp = chemin + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp, chemin)
+
+
+def supprimer_checkpoint(collection_name):
+    """Supprime le checkpoint d'une collection une fois le run terminé."""
+    try:
+        os.remove(chemin_checkpoint(collection_name))
+    except FileNotFoundError:
+        pass
+
+
+def dernier_chunk_acquis(checkpoint, pdf_file, file_hash):
+    """Retourne le dernier numéro de chunk confirmé par Qdrant pour cette version du fichier."""
+    etat = checkpoint["fichiers"].get(pdf_file)
+    if not etat or etat.get("sha256") != file_hash:
+        return 0
+    return etat.get("acquis", 0)
+
+
+def fichier_termine(checkpoint, pdf_file, file_hash):
+    """Indique si cette version du fichier a été entièrement indexée."""
+    etat = checkpoint["fichiers"].get(pdf_file)
+    return bool(etat) and etat.get("sha256") == file_hash and etat.get("termine", False)
+
+
+def marquer_acquis(checkpoint, payloads, totaux, hashes, doublons=()):
+    """Enregistre la progression après un lot confirmé par Qdrant, d'après les payloads de ses points.
+
+    `totaux` donne le nombre de chunks de chaque fichier et `hashes` son
+    empreinte, pour marquer les fichiers entièrement indexés. En mode flux,
+    le total n'est connu qu'une fois le document entièrement découpé.
+
+    `doublons` liste les chunks écartés comme quasi-doublons du lot, sous la
+    forme (identifiant du point conservé, file_name, chunk_number) : ils
+    comptent comme acquis, et le lien vers le point conservé est gardé dans
+    le checkpoint jusqu'à son report dans Qdrant.
+    """
+    chunks = [(payload["file_name"], payload["chunk_number"]) for payload in payloads]
+    for point_conserve, pdf_file, chunk_number in doublons:
+        checkpoint.setdefault("doublons", {}).setdefault(point_conserve, []).append([pdf_file, chunk_number])
+        chunks.append((pdf_file, chunk_number))
+
+    for pdf_file, chunk_number in chunks:
+        etat = checkpoint["fichiers"].setdefault(pdf_file, {"sha256": hashes[pdf_file], "acquis": 0})
+        etat["acquis"] = max(etat["acquis"], chunk_number)
+        total = totaux.get(pdf_file)
+        etat["termine"] = total is not None and etat["acquis"] >= total
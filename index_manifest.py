@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+
+# Dossier des manifests d'indexation (un fichier JSON par collection)
+MANIFEST_DIR = ".index_manifests"
+
+
+def hash_fichier(path, taille_bloc=1 << 20):
+    """Calcule l'empreinte SHA-256 du contenu d'un fichier."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def chemin_manifest(collection_name):
+    """Retourne le chemin du manifest associé à une collection."""
+    return os.path.join(MANIFEST_DIR, f"{collection_name}.json")
+
+
+def charger_manifest(collection_name):
+    """Charge le manifest d'une collection, ou un manifest vide s'il n'existe pas."""
+    try:
+        with open(chemin_manifest(collection_name), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"files": {}}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Manifest de '{collection_name}' illisible, réindexation complète : {e}")
+        return {"files": {}}
+
+
+def sauvegarder_manifest(collection_name, manifest):
+    """Écrit le manifest de manière atomique (fichier temporaire puis renommage)."""
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    chemin = chemin_manifest(collection_name)
+    tmp = chemin + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, chemin)
+
+
+def decrire_fichier(pdf_path, ancienne_entree=None):
+    """Retourne l'entrée de manifest (taille, mtime, sha256) d'un fichier.
+
+    Le hash n'est recalculé que si la taille ou la date de modification ont
+    changé, ce qui rend une exécution sans modification quasi instantanée.
+    """
+    stat = os.stat(pdf_path)
+    entree = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if (ancienne_entree
+            and ancienne_entree.get("size") == entree["size"]
+            and ancienne_entree.get("mtime_ns") == entree["mtime_ns"]
+            and ancienne_entree.get("sha256")):
+        entree["sha256"] = ancienne_entree["sha256"]
+    else:
+        entree["sha256"] = hash_fichier(pdf_path)
+    return entree
+
+
+def planifier_indexation(folder_path, manifest, parametres):
+    """Compare le dossier au manifest et retourne les fichiers à (ré)indexer et à supprimer.
+
+    Un fichier est à réindexer s'il est nouveau, si son contenu a changé ou si
+    les paramètres de chunking / de modèle (`parametres`) ont changé.
+    """
+    anciens = manifest.get("files", {})
+    pdf_files = sorted(f for f in os.listdir(folder_path) if f.endswith(".pdf"))
+
+    a_indexer, modifies, inchanges = [], [], []
+    entrees = {}
+
+    for pdf_file in pdf_files:
+        ancienne = anciens.get(pdf_file)
+        entree = decrire_fichier(os.path.join(folder_path, pdf_file), ancienne)
+        entree["params"] = parametres
+        entrees[pdf_file] = entree
+
+        if ancienne is None:
+            a_indexer.append(pdf_file)
+        elif ancienne.get("sha256") != entree["sha256"] or ancienne.get("params") != parametres:
+            a_indexer.append(pdf_file)
+            modifies.append(pdf_file)
+        else:
+            inchanges.append(pdf_file)
+
+    supprimes = sorted(set(anciens) - set(pdf_files))
+
+    return {
+        "a_indexer": a_indexer,
+        # Les nouveaux fichiers sont aussi purgés : un run interrompu a pu laisser des points partiels
+        "a_supprimer": sorted(set(a_indexer) | set(supprimes)),
+        "modifies": modifies,
+        "supprimes": supprimes,
+        "inchanges": inchanges,
+        "entrees": entrees,
+    }
@@ -1,157 +1,596 @@
 import os
-import uuid
-import pymupdf  # PyMuPDF
-import re
+import time
+from contextlib import contextmanager, nullcontext
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
-
-# Chargement du modèle MiniLM-L6
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    Fusion,
+    FusionQuery,
+    HnswConfigDiff,
+    MatchAny,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    Prefetch,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams
+)
+from chunking import generer_chunks_paragraphes, generer_chunks_tokens
+from embedding_backends import encode_vecteurs, get_backend
+from embedding_pool import EMBEDDING_WORKERS, pool_embedding
+from doc_store import get_doc_store
+from extraction_cache import get_extraction_cache
+from dedup_chunks import (
+    SEUIL_DOUBLON,
+    DeduplicateurChunks,
+    amorcer_deduplicateur,
+    fichiers_dependants,
+    retirer_doublons
+)
+from ingestion_pipeline import IngestionPipeline
+from onnx_backend import identifiant_backend
+from index_manifest import charger_manifest, hash_fichier, planifier_indexation, sauvegarder_manifest
+from index_checkpoint import (
+    charger_checkpoint,
+    cle_index,
+    fichier_termine,
+    nouveau_checkpoint,
+    supprimer_checkpoint
+)
+
+# Modèle MiniLM-L6 (vecteur unique des collections sans vecteurs nommés)
+MINILM = get_backend("minilm")
+MODEL_NAME = MINILM.model_name
+
+# Longueur maximale (max_seq_length) réellement vue par le modèle, au-delà le texte est tronqué
+MAX_TOKENS = MINILM.max_tokens
+
+# Collection unique des applications : un point par chunk, un vecteur nommé par encodeur
+COLLECTION_NAME = "corpus_medical"
+VECTEURS = ("minilm", "sapbert")
+
+# Adresse REST du serveur Qdrant (le port gRPC est 6334)
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+
+# Client gRPC (port 6334) plutôt que REST : QDRANT_PREFER_GRPC=1
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+
+# Nombre d'écritures Qdrant en parallèle pendant l'ingestion
+UPLOAD_WORKERS = int(os.getenv("QDRANT_UPLOAD_WORKERS", "1"))
+
+# Graphe HNSW : voisins par nœud et largeur de recherche à la construction (Qdrant : 16 / 100 par défaut)
+HNSW_M = 16
+HNSW_EF_CONSTRUCT = 200
+
+# Taille (Ko) des vecteurs d'un segment au-delà de laquelle Qdrant construit l'index HNSW (défaut de Qdrant)
+SEUIL_INDEXATION_KO = 20000
+
+# Candidats récupérés par vecteur (multiple de top_k) avant la fusion des classements
+CANDIDATS_FUSION = 4
+
+# Chevauchement par défaut du découpage en tokens
+CHEVAUCHEMENT_TOKENS = 32
+
+# Nombre de chunks encodés par passe avant du modèle
+EMBEDDING_BATCH_SIZE = 64
+
+
+def get_embeddings(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """Convertit une liste de textes en embeddings, encodés par lots avec MiniLM-L6.
+
+    Retourne une matrice float32 contiguë de forme (len(texts), 384), sans
+    conversion en listes de floats Python. Les textes déjà présents dans le
+    cache d'embeddings ne repassent pas par le modèle. Avec
+    EMBEDDING_BACKEND=onnx, l'encodage passe par ONNX Runtime.
+    """
+    return MINILM.encode(list(texts), batch_size=batch_size)
 
 
 def get_embedding(text):
-    """Convertit un texte en embedding avec MiniLM-L6."""
-    return model.encode(text, convert_to_numpy=False).tolist()
-
-
-def generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement):
-    """Génère des chunks en fonction du nombre de mots avec chevauchement."""
-    chunks = []
-    mots = " ".join(paragraphes).split()
-    n = len(mots)
+    """Convertit un texte en embedding avec MiniLM-L6 (vecteur float32)."""
+    return get_embeddings([text], batch_size=1)[0]
 
-    if chevauchement >= taille_chunk:
-        raise ValueError("Le chevauchement doit être inférieur à la taille du chunk.")
 
-    debut = 0
-    while debut < n:
-        fin = min(debut + taille_chunk, n)
-        chunk = " ".join(mots[debut:fin])
-        chunks.append(chunk)
+def connect_to_qdrant(prefer_grpc=QDRANT_PREFER_GRPC, url=QDRANT_URL):
+    """Connexion au serveur Qdrant (en gRPC si `prefer_grpc`, pour les chargements en masse)."""
+    return QdrantClient(url=url, grpc_port=6334, prefer_grpc=prefer_grpc)
 
-        if fin == n:
-            break
 
-        debut += (taille_chunk - chevauchement)
+def config_quantization(quantization):
+    """Retourne la configuration Qdrant d'une quantization ("int8", "binary" ou None)."""
+    if quantization is None:
+        return None
+    if quantization == "int8":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"Quantization inconnue : {quantization!r} (attendu 'int8', 'binary' ou None).")
 
-    return chunks
-
-
-def extract_text_from_pdf(pdf_path):
-    """Extrait et nettoie le texte d'un PDF en paragraphes."""
-    try:
-        doc = pymupdf.open(pdf_path)
-        contenu_complet = []
 
-        for num_page in range(len(doc)):
-            page = doc[num_page]
-            texte = page.get_text("text").strip()
+def create_collection(client, collection_name, vector_size=384, quantization=None, vectors_on_disk=None,
+                      vectors=None, bulk=False, hnsw_m=HNSW_M, hnsw_ef_construct=HNSW_EF_CONSTRUCT):
+    """Crée une collection dans Qdrant si elle n'existe pas.
 
-            if texte:
-                contenu_complet.append(texte)
+    Avec `quantization` ("int8" ou "binary"), seuls les vecteurs quantifiés
+    restent en RAM ; les vecteurs float32 d'origine sont stockés sur disque
+    (sauf `vectors_on_disk=False`) et ne servent qu'au rescoring.
 
-        doc.close()
-
-        if not contenu_complet:
-            print(f"Le document {pdf_path} est vide ou illisible.")
-            return []
-
-        texte_propre = re.sub(r"\n{2,}", "\n", "\n".join(contenu_complet))
-        texte_propre = re.sub(r"\s+", " ", texte_propre).strip()
-
-        return [p.strip() for p in texte_propre.split("\n") if p.strip()]
-
-    except Exception as e:
-        print(f"Erreur de lecture du PDF {pdf_path} : {e}")
-        return []
+    `vectors` (ex. `VECTEURS`) crée un vecteur nommé par encodeur du registre,
+    dimensionné d'après l'encodeur ; `vector_size` est alors ignoré. Un
+    dictionnaire {nom: dimension} fixe les dimensions (copie, import).
 
-
-def connect_to_qdrant():
-    """Connexion au serveur Qdrant."""
-    return QdrantClient(url="http://localhost:6333")
-
-
-def create_collection(client, collection_name, vector_size=384):
-    """Crée une collection dans Qdrant si elle n'existe pas."""
+    Avec `bulk=True`, la collection est créée sans indexation HNSW : les
+    points se chargent sans reconstruire le graphe au fil de l'eau, et
+    `activer_indexation` le construit une seule fois à la fin.
+    """
     collections = client.get_collections()
 
     if any(col.name == collection_name for col in collections.collections):
         print(f"✅ Collection '{collection_name}' existe déjà. Skipping creation.")
         return False
 
+    if vectors_on_disk is None:
+        vectors_on_disk = quantization is not None
+
+    if vectors:
+        dims = vectors if isinstance(vectors, dict) else {nom: get_backend(nom).dim for nom in vectors}
+        vectors_config = {
+            nom: VectorParams(size=dim, distance=Distance.COSINE, on_disk=vectors_on_disk)
+            for nom, dim in dims.items()
+        }
+    else:
+        vectors_config = VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=vectors_on_disk)
+
     client.create_collection(
         collection_name=collection_name,
-        vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+        vectors_config=vectors_config,
+        quantization_config=config_quantization(quantization),
+        hnsw_config=HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=0 if bulk else SEUIL_INDEXATION_KO),
     )
+    # Index sur file_name / index_key pour les suppressions en masse de l'indexation incrémentale
+    client.create_payload_index(collection_name, field_name="file_name", field_schema=PayloadSchemaType.KEYWORD)
+    client.create_payload_index(collection_name, field_name="index_key", field_schema=PayloadSchemaType.KEYWORD)
+    # Index sur les fichiers des chunks fusionnés comme quasi-doublons d'un point
+    client.create_payload_index(collection_name, field_name="fichiers_doublons", field_schema=PayloadSchemaType.KEYWORD)
     print(f"✅ Collection '{collection_name}' créée.")
     return True
 
 
-def index_all_pdfs(client, collection_name, folder_path, taille_chunk=128, chevauchement=50, batch_size=50):
-    """Indexe tous les PDFs d'un dossier dans Qdrant en découpant le texte en chunks."""
-    pdf_files = [f for f in os.listdir(folder_path) if f.endswith(".pdf")]
+def index_attendu(info):
+    """Nombre de vecteurs que Qdrant doit indexer en HNSW, d'après la taille moyenne des segments.
+
+    Un segment plus petit que `indexing_threshold` (Ko) reste en recherche
+    exacte : une petite collection, ou une collection chargée en masse, n'a
+    aucun vecteur à indexer.
+    """
+    seuil = info.config.optimizer_config.indexing_threshold
+    vecteurs = info.config.params.vectors
+    dims = [v.size for v in vecteurs.values()] if isinstance(vecteurs, dict) else [vecteurs.size]
+    points = info.points_count or 0
+    if not seuil or points * sum(dims) * 4 / max(info.segments_count or 1, 1) / 1024 < seuil:
+        return 0
+    return points * len(dims)
+
+
+def attendre_optimisation(client, collection_name, delai=0.5, stabilite=10):
+    """Attend que Qdrant ait fini de construire les index de la collection.
+
+    Le statut reste "green" tant que l'optimiseur n'a pas démarré : on attend
+    aussi que les vecteurs indexés couvrent les points de la collection, ou,
+    pour un segment resté sous le seuil, que leur nombre ne bouge plus
+    pendant `stabilite` secondes.
+    """
+    indexes, depuis = None, time.perf_counter()
+    while True:
+        info = client.get_collection(collection_name)
+        if info.indexed_vectors_count != indexes or info.status.value != "green":
+            indexes, depuis = info.indexed_vectors_count, time.perf_counter()
+        if info.status.value == "green" and (
+            (indexes or 0) >= index_attendu(info) or time.perf_counter() - depuis >= stabilite
+        ):
+            return
+        time.sleep(delai)
+
+
+def differer_indexation(client, collection_name):
+    """Suspend la construction de l'index HNSW : les points chargés restent dans des segments non indexés."""
+    client.update_collection(collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=0))
+
+
+def activer_indexation(client, collection_name, hnsw_m=HNSW_M, hnsw_ef_construct=HNSW_EF_CONSTRUCT, attendre=True):
+    """Rétablit l'indexation HNSW avec les paramètres donnés et attend que la collection soit prête."""
+    debut = time.perf_counter()
+    client.update_collection(
+        collection_name,
+        hnsw_config=HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=SEUIL_INDEXATION_KO)
+    )
+    if attendre:
+        attendre_optimisation(client, collection_name)
+        print(f"✅ Index HNSW de '{collection_name}' construit (m={hnsw_m}, ef_construct={hnsw_ef_construct}) "
+              f"en {time.perf_counter() - debut:.1f}s.")
 
-    if not pdf_files:
-        print(f"⚠️ Aucun fichier PDF trouvé dans '{folder_path}' !")
-        return
 
-    points = []
+@contextmanager
+def chargement_en_masse(client, collection_name, hnsw_m=HNSW_M, hnsw_ef_construct=HNSW_EF_CONSTRUCT):
+    """Charge des points sans indexation HNSW, puis construit le graphe en une fois à la sortie du bloc.
+
+    En cas d'erreur, l'indexation est rétablie sans attendre la fin de la
+    construction et l'exception est propagée.
+    """
+    differer_indexation(client, collection_name)
+    try:
+        yield
+    except BaseException:
+        activer_indexation(client, collection_name, hnsw_m, hnsw_ef_construct, attendre=False)
+        raise
+    activer_indexation(client, collection_name, hnsw_m, hnsw_ef_construct)
+
+
+def configurer_chunking(taille_chunk, chevauchement, chunking="mots", chevauchement_tokens=CHEVAUCHEMENT_TOKENS,
+                        vectors=None):
+    """Retourne (chunk_fn, taille, chevauchement, unité) pour le mode de découpage demandé.
+
+    En mode "tokens", les chunks sont remplis jusqu'à la longueur maximale du
+    tokenizer de l'encodeur le plus limitant parmi `vectors` (MiniLM par
+    défaut) au lieu d'un nombre fixe de mots.
+    """
+    if chunking == "tokens":
+        backend = min((get_backend(nom) for nom in vectors or ("minilm",)), key=lambda b: b.max_tokens)
+        return (
+            lambda paragraphes: generer_chunks_tokens(paragraphes, backend.get_tokenizer(), backend.max_tokens,
+                                                      chevauchement_tokens),
+            backend.max_tokens, chevauchement_tokens, "tokens"
+        )
+    if chunking != "mots":
+        raise ValueError(f"Mode de découpage inconnu : {chunking!r} (attendu 'mots' ou 'tokens').")
+    return (
+        lambda paragraphes: generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement),
+        taille_chunk, chevauchement, "mots"
+    )
 
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(folder_path, pdf_file)
-        paragraphes = extract_text_from_pdf(pdf_path)
-
-        if not paragraphes:
-            continue
-
-        chunks = generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement)
-
-        for j, chunk in enumerate(chunks):
-            embedding = get_embedding(chunk)
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    "file_name": pdf_file,
-                    "chunk_number": j + 1,
-                    "chunk_text": chunk
-                }
-            )
-            points.append(point)
-            print(f"Chunk {j+1} de '{pdf_file}' indexé avec ID {point.id}.")
 
-            if len(points) >= batch_size:
-                client.upsert(collection_name=collection_name, wait=True, points=points)
-                print(f" {len(points)} chunks envoyés à Qdrant.")
-                points = []
+def parametres_index(taille_chunk, chevauchement, unite, vectors=None, dedup=False):
+    """Paramètres qui, s'ils changent, imposent de réindexer un fichier."""
+    parametres = {"taille_chunk": taille_chunk, "chevauchement": chevauchement,
+                  "model": identifiant_backend(MODEL_NAME)}
+    if vectors:
+        parametres["model"] = {nom: identifiant_backend(get_backend(nom).model_name) for nom in vectors}
+    if dedup:
+        parametres["dedup"] = SEUIL_DOUBLON
+    if unite != "mots":
+        parametres["unite"] = unite
+    return parametres
+
+
+def index_all_pdfs(client, collection_name, folder_path, taille_chunk=128, chevauchement=50, batch_size=50,
+                   embedding_batch_size=EMBEDDING_BATCH_SIZE, extraction_workers=None, pdf_files=None,
+                   file_hashes=None, resume=True, streaming=False, chunking="mots",
+                   chevauchement_tokens=CHEVAUCHEMENT_TOKENS, doc_store=False, vectors=None, dedup=False,
+                   upload_workers=UPLOAD_WORKERS, progression=None, embedding_workers=EMBEDDING_WORKERS):
+    """Indexe tous les PDFs d'un dossier (ou `pdf_files`) dans Qdrant via `IngestionPipeline`.
+
+    Les identifiants de points dépendent du fichier, des paramètres de
+    chunking et du numéro de chunk : un run repris (`resume=True`) réécrit
+    les mêmes points. Les options (`streaming`, `chunking`, `doc_store`,
+    `vectors`, `dedup`, `upload_workers`, `embedding_workers`) sont
+    transmises au pipeline ; `progression` reçoit l'avancement.
+
+    Retourne (statistiques par étape, fichiers dont la lecture a échoué en
+    cours de document) : ces derniers ne doivent pas être notés comme indexés.
+    """
+    if pdf_files is None:
+        pdf_files = sorted(f for f in os.listdir(folder_path) if f.endswith(".pdf"))
 
-    if points:
-        client.upsert(collection_name=collection_name, wait=True, points=points)
-        print(f"✅ Derniers {len(points)} chunks envoyés à Qdrant.")
+    if not pdf_files:
+        print(f"⚠️ Aucun fichier PDF trouvé dans '{folder_path}' !")
+        return [], []
 
+    if streaming and chunking != "mots":
+        raise ValueError("Le mode flux ne prend en charge que le découpage en mots.")
+    if streaming and doc_store:
+        raise ValueError("Le mode flux ne prend pas en charge le store de documents.")
 
-def get_similar_documents(client, collection_name, query_text, top_k):
-    """Recherche les documents similaires dans Qdrant et retourne les résultats."""
-    query_embedding = get_embedding(query_text)
-    results = client.search(
+    chunk_fn, taille_chunk, chevauchement, unite = configurer_chunking(
+        taille_chunk, chevauchement, chunking, chevauchement_tokens, vectors
+    )
+    parametres = parametres_index(taille_chunk, chevauchement, unite, vectors, dedup)
+    checkpoint = charger_checkpoint(collection_name, parametres) if resume else nouveau_checkpoint(parametres)
+
+    hashes = dict(file_hashes or {})
+    for pdf_file in pdf_files:
+        if pdf_file not in hashes:
+            hashes[pdf_file] = hash_fichier(os.path.join(folder_path, pdf_file))
+
+    a_traiter = [f for f in pdf_files if not fichier_termine(checkpoint, f, hashes[f])]
+    if len(a_traiter) < len(pdf_files):
+        print(f"↩️ Reprise : {len(pdf_files) - len(a_traiter)} fichier(s) déjà indexé(s) d'après le checkpoint.")
+
+    if vectors:
+        embed_fn = lambda textes: encode_vecteurs(textes, vectors, batch_size=embedding_batch_size)
+    else:
+        embed_fn = lambda textes: MINILM.encode(textes, batch_size=embedding_batch_size)
+
+    deduplicateur = None
+    if dedup:
+        # Les chunks déjà indexés (autres fichiers, run interrompu) servent de référence aux nouveaux
+        deduplicateur = DeduplicateurChunks()
+        amorces = amorcer_deduplicateur(deduplicateur, client, collection_name)
+        if amorces:
+            print(f"🔎 Déduplication : {amorces} chunks déjà indexés servent de référence.")
+
+    with pool_embedding(embedding_workers) as (workers, _):
+        pipeline = IngestionPipeline(
+            client, collection_name,
+            embed_fn=embed_fn,
+            chunk_fn=chunk_fn,
+            taille_chunk=taille_chunk,
+            chevauchement=chevauchement,
+            hashes=hashes,
+            checkpoint=checkpoint,
+            batch_size=batch_size,
+            embedding_batch_size=embedding_batch_size * workers,
+            extraction_workers=extraction_workers,
+            streaming=streaming,
+            unite_chunk=unite,
+            doc_store=get_doc_store(collection_name) if doc_store else None,
+            dedup=deduplicateur,
+            upload_workers=upload_workers,
+            progression=progression,
+            compter_tokens=get_backend(vectors[0] if vectors else "minilm").compter_tokens
+        )
+        if progression is not None:
+            progression.demarrer(len(pdf_files), len(pdf_files) - len(a_traiter))
+        stats = pipeline.run([os.path.join(folder_path, pdf_file) for pdf_file in a_traiter])
+
+    if pipeline.doublons:
+        noms_vecteurs = vectors or ("minilm",)
+        octets = pipeline.doublons * sum(get_backend(nom).dim for nom in noms_vecteurs) * 4
+        if not doc_store:
+            octets += pipeline.caracteres_doublons
+        print(f"♻️ {pipeline.doublons} chunks quasi dupliqués fusionnés : "
+              f"{pipeline.doublons * len(noms_vecteurs)} embeddings évités, ~{octets / 1e6:.1f} Mo d'index économisés.")
+
+    supprimer_checkpoint(collection_name)
+    if not streaming and get_extraction_cache() is not None:
+        get_extraction_cache().afficher_stats()
+    for nom in vectors or ("minilm",):
+        cache = get_backend(nom).get_cache()
+        if cache is not None:
+            cache.afficher_stats()
+    return stats, sorted(pipeline.echecs)
+
+
+def supprimer_fichiers(client, collection_name, file_names, cles_a_conserver=None):
+    """Supprime en une seule requête tous les points des fichiers donnés.
+
+    Les points dont la `index_key` figure dans `cles_a_conserver` (version
+    courante d'un fichier, partiellement indexée par un run interrompu) sont
+    conservés.
+    """
+    if not file_names:
+        return
+    must_not = []
+    if cles_a_conserver:
+        must_not.append(FieldCondition(key="index_key", match=MatchAny(any=list(cles_a_conserver))))
+    client.delete(
         collection_name=collection_name,
-        query_vector=query_embedding,
-        limit=top_k,
-        with_payload=True
+        points_selector=FilterSelector(
+            filter=Filter(
+                must=[FieldCondition(key="file_name", match=MatchAny(any=list(file_names)))],
+                must_not=must_not or None
+            )
+        ),
+        wait=True
+    )
+    # Les chunks de ces fichiers fusionnés dans les points d'autres fichiers n'en sont plus des sources
+    retirer_doublons(client, collection_name, file_names)
+    print(f"🗑️ Points de {len(file_names)} fichier(s) supprimés de '{collection_name}'.")
+
+
+def index_incremental(client, collection_name, folder_path, taille_chunk=128, chevauchement=50, batch_size=50,
+                      embedding_batch_size=EMBEDDING_BATCH_SIZE, extraction_workers=None, chunking="mots",
+                      chevauchement_tokens=CHEVAUCHEMENT_TOKENS, doc_store=False, vectors=None, dedup=False,
+                      upload_workers=UPLOAD_WORKERS, bulk=None, hnsw_m=HNSW_M, hnsw_ef_construct=HNSW_EF_CONSTRUCT,
+                      progression=None, embedding_workers=EMBEDDING_WORKERS):
+    """Indexe uniquement les PDFs nouveaux ou modifiés depuis le dernier passage.
+
+    Un manifest par collection conserve le hash de contenu de chaque fichier
+    ainsi que les paramètres de chunking et le modèle utilisés. Les points des
+    fichiers supprimés ou modifiés sont effacés en masse avant réindexation.
+
+    Avec `dedup=True`, les fichiers inchangés dont des chunks avaient été
+    fusionnés dans les points d'un fichier effacé sont réindexés aussi.
+
+    Avec `bulk=True`, les points sont chargés sans indexation HNSW et le graphe
+    est construit une seule fois à la fin (`chargement_en_masse`). Par défaut,
+    ce mode est utilisé quand la collection est vide (reconstruction complète).
+
+    `progression` suit l'avancement (voir `index_all_pdfs`), puis la
+    construction de l'index HNSW en mode masse.
+    """
+    debut = time.perf_counter()
+    manifest = charger_manifest(collection_name)
+    vide = client.count(collection_name=collection_name, exact=True).count == 0
+    if bulk is None:
+        bulk = vide
+
+    # Collection recréée (ex. après delete.py) : le manifest ne reflète plus son contenu
+    if manifest["files"] and vide:
+        print(f"⚠️ Collection '{collection_name}' vide, le manifest est ignoré.")
+        manifest = {"files": {}}
+
+    _, taille_index, chevauchement_index, unite = configurer_chunking(
+        taille_chunk, chevauchement, chunking, chevauchement_tokens, vectors
     )
+    parametres = parametres_index(taille_index, chevauchement_index, unite, vectors, dedup)
+    plan = planifier_indexation(folder_path, manifest, parametres)
+
+    if not plan["a_indexer"] and not plan["supprimes"]:
+        print(f"✅ '{collection_name}' est à jour ({len(plan['inchanges'])} fichiers, "
+              f"{time.perf_counter() - debut:.1f}s).")
+        return plan
+
+    dependants = ajouter_dependants(client, collection_name, plan) if dedup else []
+
+    print(f"🔄 {len(plan['a_indexer']) - len(plan['modifies']) - len(dependants)} nouveau(x), "
+          f"{len(plan['modifies'])} modifié(s), {len(plan['supprimes'])} supprimé(s), "
+          f"{len(plan['inchanges'])} inchangé(s).")
+    if dependants:
+        print(f"♻️ {len(dependants)} fichier(s) inchangé(s) réindexé(s) : leurs doublons vivaient dans des points effacés.")
+
+    hashes = {f: plan["entrees"][f]["sha256"] for f in plan["a_indexer"]}
+    # Les points des fichiers dépendants sont complets mais doivent être effacés : leurs clés ne sont pas protégées
+    cles_courantes = [cle_index(hashes[f], taille_index, chevauchement_index, unite, dedup)
+                      for f in plan["a_indexer"] if f not in dependants]
+    supprimer_fichiers(client, collection_name, plan["a_supprimer"], cles_a_conserver=cles_courantes)
+
+    echecs = []
+    if plan["a_indexer"]:
+        if bulk:
+            print("📦 Chargement en masse : l'index HNSW sera construit après le chargement des points.")
+        with chargement_en_masse(client, collection_name, hnsw_m, hnsw_ef_construct) if bulk else nullcontext():
+            _, echecs = index_all_pdfs(
+                client, collection_name, folder_path, taille_chunk, chevauchement, batch_size,
+                embedding_batch_size=embedding_batch_size, extraction_workers=extraction_workers,
+                pdf_files=plan["a_indexer"], file_hashes=hashes, chunking=chunking,
+                chevauchement_tokens=chevauchement_tokens, doc_store=doc_store, vectors=vectors,
+                dedup=dedup, upload_workers=upload_workers, progression=progression,
+                embedding_workers=embedding_workers
+            )
+            if bulk and progression is not None:
+                progression.changer_etape("construction de l'index HNSW")
+
+    if doc_store and plan["a_supprimer"]:
+        # Retire du store le texte des versions de fichiers qui ne sont plus indexées
+        get_doc_store(collection_name).compacter(sorted({e["sha256"] for e in plan["entrees"].values()}))
+
+    # Un fichier tronqué par une erreur de lecture reste hors du manifest : il sera retraité au prochain run
+    manifest["files"] = {f: entree for f, entree in plan["entrees"].items() if f not in echecs}
+    sauvegarder_manifest(collection_name, manifest)
+    print(f"✅ Indexation incrémentale de '{collection_name}' terminée en {time.perf_counter() - debut:.1f}s.")
+    return plan
+
+
+def ajouter_dependants(client, collection_name, plan):
+    """Ajoute au plan les fichiers inchangés dont des doublons vivent dans des points qui vont être effacés.
+
+    Les réindexer efface à leur tour leurs points : on répète jusqu'à ce
+    qu'aucun nouveau fichier ne soit concerné.
+    """
+    ajoutes = []
+    a_verifier = list(plan["a_supprimer"])
+    while a_verifier:
+        dependants = sorted(fichiers_dependants(client, collection_name, a_verifier) & set(plan["inchanges"]))
+        for pdf_file in dependants:
+            plan["inchanges"].remove(pdf_file)
+            plan["a_indexer"].append(pdf_file)
+            plan["a_supprimer"].append(pdf_file)
+        ajoutes.extend(dependants)
+        a_verifier = dependants
+    return ajoutes
+
+
+def params_recherche(oversampling=None, rescore=True):
+    """Paramètres de recherche sur une collection quantifiée (None : réglages par défaut de Qdrant)."""
+    if oversampling is None:
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(ignore=False, rescore=rescore, oversampling=oversampling))
+
+
+def get_similar_documents(client, collection_name, query_text, top_k, oversampling=None, rescore=True,
+                          vector=None):
+    """Recherche les documents similaires dans Qdrant et retourne les résultats.
+
+    Sur une collection quantifiée, `oversampling` récupère `top_k * oversampling`
+    candidats avec les vecteurs quantifiés, puis `rescore` les reclasse avec
+    les vecteurs float32 d'origine.
+
+    Sur une collection à vecteurs nommés, `vector` choisit le vecteur
+    interrogé ("minilm" ou "sapbert"). Une liste de noms interroge chacun de
+    ces vecteurs et fusionne les classements (Reciprocal Rank Fusion, côté
+    Qdrant) : le score retourné est alors le score de fusion, pas un cosinus.
+
+    Le vecteur de la requête reste un tableau float32 jusqu'au client Qdrant,
+    qui le sérialise directement.
+    """
+    search_params = params_recherche(oversampling, rescore)
+    if vector is None:
+        results = client.search(
+            collection_name=collection_name,
+            query_vector=get_embedding(query_text),
+            limit=top_k,
+            with_payload=True,
+            search_params=search_params
+        )
+    elif isinstance(vector, str):
+        results = client.query_points(
+            collection_name=collection_name,
+            query=get_backend(vector).encode([query_text], batch_size=1)[0],
+            using=vector,
+            limit=top_k,
+            with_payload=True,
+            search_params=search_params
+        ).points
+    else:
+        # Prefetch est un modèle pydantic : il attend des listes de floats
+        prefetch = [
+            Prefetch(query=get_backend(nom).encode([query_text], batch_size=1)[0].tolist(), using=nom,
+                     limit=top_k * CANDIDATS_FUSION, params=search_params)
+            for nom in vector
+        ]
+        results = client.query_points(
+            collection_name=collection_name,
+            prefetch=prefetch,
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=top_k,
+            with_payload=True
+        ).points
 
     if not results:
         print(" Aucun document similaire trouvé.")
         return []
 
+    return formater_resultats(client, collection_name, results)
+
+
+def formater_resultats(client, collection_name, results):
+    """Met en forme les résultats Qdrant, en relisant depuis le store local les chunks stockés par offsets.
+
+    Le store est celui de la version interrogée : un alias est résolu vers sa collection.
+    """
+    # Import local : collection_versions dépend de ce module
+    from collection_versions import resoudre_alias
+
+    textes = [res.payload.get("chunk_text") for res in results]
+
+    a_hydrater = [i for i, res in enumerate(results) if textes[i] is None and "doc_id" in res.payload]
+    if a_hydrater:
+        refs = [(results[i].payload["doc_id"], results[i].payload["start"], results[i].payload["end"])
+                for i in a_hydrater]
+        store = get_doc_store(resoudre_alias(client, collection_name) or collection_name)
+        for i, texte in zip(a_hydrater, store.hydrater(refs)):
+            textes[i] = texte
+
     return [
         {
             "id": res.id,
             "score": res.score,
             "file_name": res.payload.get("file_name"),
             "chunk_number": res.payload.get("chunk_number"),
-            "chunk_text": res.payload.get("chunk_text")
+            "chunk_text": texte,
+            "doublons": res.payload.get("doublons", [])
         }
-        for res in results
+        for res, texte in zip(results, textes)
     ]
@@ -0,0 +1,151 @@
+import threading
+import time
+import traceback
+
+from collection_versions import preparer_collection, resoudre_alias
+
+# Étape pendant laquelle le pipeline d'ingestion traite les documents
+ETAPE_DOCUMENTS = "indexation des documents"
+
+
+class ProgressionIndexation:
+    """Avancement d'une indexation : fichiers terminés, chunks traités et temps restant estimé.
+
+    Mise à jour par le thread d'upload du pipeline d'ingestion et lue par
+    l'interface : tous les accès passent par un verrou (réentrant, pour
+    qu'un afficheur puisse lire l'état et l'écrire sans être interrompu par
+    un changement d'étape).
+    """
+
+    def __init__(self):
+        self.verrou = threading.RLock()
+        self.etape = "analyse des documents"
+        self.fichiers_total = 0
+        self.fichiers_deja_indexes = 0
+        self.fichiers_termines = 0
+        self.chunks = 0
+        self.debut = None
+
+    def demarrer(self, fichiers_total, fichiers_deja_indexes=0):
+        """Début du pipeline : `fichiers_deja_indexes` ont été terminés par un run précédent (checkpoint)."""
+        with self.verrou:
+            self.etape = ETAPE_DOCUMENTS
+            self.fichiers_total = fichiers_total
+            self.fichiers_deja_indexes = fichiers_deja_indexes
+            self.fichiers_termines = 0
+            self.chunks = 0
+            self.debut = time.perf_counter()
+
+    def avancer(self, fichiers_termines, chunks):
+        """Ajoute les fichiers terminés et les chunks acquis par un lot confirmé par Qdrant."""
+        with self.verrou:
+            self.fichiers_termines += fichiers_termines
+            self.chunks += chunks
+
+    def changer_etape(self, etape):
+        with self.verrou:
+            self.etape = etape
+
+    def terminer(self):
+        """Fin du pipeline : les documents sont tous traités."""
+        self.changer_etape("finalisation")
+
+    def instantane(self):
+        """Retourne une copie cohérente de l'avancement, avec la fraction terminée et l'ETA en secondes (ou None)."""
+        with self.verrou:
+            faits = self.fichiers_deja_indexes + self.fichiers_termines
+            ecoule = time.perf_counter() - self.debut if self.debut is not None else 0.0
+            # Estimation au débit des fichiers terminés pendant ce run
+            eta = None
+            if self.fichiers_termines:
+                eta = ecoule / self.fichiers_termines * max(0, self.fichiers_total - faits)
+            return {
+                "etape": self.etape,
+                "fichiers_total": self.fichiers_total,
+                "fichiers_termines": faits,
+                "chunks": self.chunks,
+                "ecoule": ecoule,
+                "eta": eta,
+                "fraction": faits / self.fichiers_total if self.fichiers_total else 0.0,
+            }
+
+    def resume(self):
+        """Décrit l'avancement en une ligne : étape, fichiers, chunks, débit et temps restant."""
+        p = self.instantane()
+        if not p["fichiers_total"]:
+            return f"⏳ {p['etape'].capitalize()}..."
+        texte = (f"⏳ {p['etape'].capitalize()} : {p['fichiers_termines']}/{p['fichiers_total']} fichiers, "
+                 f"{p['chunks']} chunks")
+        if p["chunks"] and p["ecoule"] > 0:
+            texte += f" ({p['chunks'] / p['ecoule']:.1f} chunks/s)"
+        if p["eta"] is not None:
+            texte += f", encore ~{formater_duree(p['eta'])}"
+        return texte
+
+
+class IndexationArrierePlan:
+    """Prépare l'index d'une application Streamlit dans un thread, sans bloquer le premier affichage.
+
+    `preparer_collection` tourne en arrière-plan et rend compte de son
+    avancement par une `ProgressionIndexation`. Les recherches passent par
+    l'alias : pendant une mise à jour, elles sont servies par la version
+    active de l'index. Au premier démarrage, l'alias n'existe qu'une fois la
+    première version construite et validée : l'index est alors « en
+    préchauffage » et `interrogeable()` permet d'échouer immédiatement au
+    lieu d'attendre.
+    """
+
+    def __init__(self, client, alias, folder_path, **options):
+        self.client = client
+        self.alias = alias
+        self.folder_path = folder_path
+        self.options = options
+        self.progression = ProgressionIndexation()
+        self.etat = "en attente"
+        self.erreur = None
+        self.active_au_demarrage = False
+        self.thread = None
+
+    def demarrer(self):
+        """Lance la préparation de l'index dans un thread démon et rend la main immédiatement."""
+        self.active_au_demarrage = (resoudre_alias(self.client, self.alias) is not None
+                                    or self.client.collection_exists(self.alias))
+        self.etat = "indexation"
+        self.thread = threading.Thread(target=self._preparer, name="indexation", daemon=True)
+        self.thread.start()
+        return self
+
+    def _preparer(self):
+        try:
+            preparer_collection(self.client, self.alias, self.folder_path,
+                                progression=self.progression, **self.options)
+            self.etat = "prete"
+        except Exception as e:
+            self.erreur = e
+            self.etat = "erreur"
+            traceback.print_exc()
+
+    def interrogeable(self):
+        """Indique si une version de l'index peut déjà répondre aux recherches."""
+        return self.etat == "prete" or self.active_au_demarrage
+
+    def resume(self):
+        """Décrit l'état de l'indexation en une ligne, pour l'interface."""
+        if self.etat == "prete":
+            return "✅ Index à jour."
+        if self.etat == "erreur":
+            return f"❌ Échec de l'indexation : {self.erreur}"
+        texte = self.progression.resume()
+        if not self.interrogeable():
+            texte += " — index en préchauffage, recherches indisponibles"
+        return texte
+
+
+def formater_duree(secondes):
+    """Durée lisible : « 45 s », « 3 min 20 s », « 1 h 05 min »."""
+    secondes = int(secondes)
+    if secondes < 60:
+        return f"{secondes} s"
+    if secondes < 3600:
+        return f"{secondes // 60} min {secondes % 60:02d} s"
+    return f"{secondes // 3600} h {secondes % 3600 // 60:02d} min"
@@ -0,0 +1,102 @@
+import argparse
+import sys
+import threading
+
+from collection_versions import VERSIONS_CONSERVEES, preparer_collection, reconstruire, resoudre_alias
+from embedding_backends import BACKENDS
+from embedding_pool import repartition
+from indexall_minilm import (
+    COLLECTION_NAME,
+    EMBEDDING_BATCH_SIZE,
+    QDRANT_PREFER_GRPC,
+    UPLOAD_WORKERS,
+    VECTEURS,
+    connect_to_qdrant
+)
+from indexation_arriere_plan import ETAPE_DOCUMENTS, ProgressionIndexation
+
+
+def afficher_progression(progression, arret, intervalle=0.5):
+    """Réécrit une seule ligne du terminal avec l'avancement, tant que le pipeline traite les documents.
+
+    Le verrou de la progression est gardé pendant l'écriture : une fois
+    `terminer()` appelé par le pipeline, plus aucune ligne n'est écrite et
+    le bilan s'affiche proprement à la suite.
+    """
+    while not arret.wait(intervalle):
+        with progression.verrou:
+            if progression.etape == ETAPE_DOCUMENTS:
+                sys.stdout.write(f"\r{progression.resume()}\033[K")
+                sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Indexe un dossier de PDFs dans Qdrant, derrière l'alias interrogé par les applications."
+    )
+    parser.add_argument("--folder", default="ALLERG_IA", help="Dossier des PDFs à indexer")
+    parser.add_argument("--collection", default=COLLECTION_NAME, help="Alias de la collection (versions : <alias>_v<date>)")
+    parser.add_argument("--model", default=",".join(VECTEURS),
+                        help=f"Encodeurs, séparés par des virgules (vecteurs nommés) : {', '.join(sorted(BACKENDS))}")
+    parser.add_argument("--batch-size", type=int, default=50, help="Points par écriture Qdrant")
+    parser.add_argument("--embedding-batch-size", type=int, default=EMBEDDING_BATCH_SIZE,
+                        help="Chunks par passe du modèle")
+    parser.add_argument("--extraction-workers", type=int, default=None,
+                        help="Processus d'extraction des PDFs (défaut : nombre de CPU)")
+    parser.add_argument("--embedding-workers", default="auto",
+                        help="Processus d'encodage : \"auto\" (selon les cœurs) ou un nombre (1 : pas de pool)")
+    parser.add_argument("--upload-workers", type=int, default=UPLOAD_WORKERS, help="Écritures Qdrant en parallèle")
+    parser.add_argument("--chunking", choices=["mots", "tokens"], default="mots")
+    parser.add_argument("--taille-chunk", type=int, default=128)
+    parser.add_argument("--chevauchement", type=int, default=50)
+    parser.add_argument("--doc-store", action="store_true", help="Texte des documents stocké hors des payloads")
+    parser.add_argument("--sans-dedup", action="store_true", help="Indexe aussi les chunks quasi dupliqués")
+    parser.add_argument("--grpc", action="store_true", default=QDRANT_PREFER_GRPC, help="Client gRPC (port 6334)")
+    parser.add_argument("--reconstruire", action="store_true",
+                        help="Reconstruit une nouvelle version complète puis y bascule l'alias")
+    parser.add_argument("--garder", type=int, default=VERSIONS_CONSERVEES,
+                        help="Versions conservées après une reconstruction")
+    args = parser.parse_args()
+
+    vectors = tuple(nom.strip() for nom in args.model.split(",") if nom.strip())
+    inconnus = [nom for nom in vectors if nom not in BACKENDS]
+    if not vectors or inconnus:
+        parser.error(f"encodeur(s) inconnu(s) : {', '.join(inconnus) or '(aucun)'}")
+    try:
+        repartition(args.embedding_workers)
+    except ValueError:
+        parser.error(f"--embedding-workers : \"auto\" ou un nombre attendu, pas {args.embedding_workers!r}")
+
+    progression = ProgressionIndexation()
+    options = dict(
+        taille_chunk=args.taille_chunk,
+        chevauchement=args.chevauchement,
+        batch_size=args.batch_size,
+        embedding_batch_size=args.embedding_batch_size,
+        extraction_workers=args.extraction_workers,
+        upload_workers=args.upload_workers,
+        embedding_workers=args.embedding_workers,
+        chunking=args.chunking,
+        doc_store=args.doc_store,
+        vectors=vectors,
+        dedup=not args.sans_dedup,
+        progression=progression
+    )
+
+    arret = threading.Event()
+    afficheur = threading.Thread(target=afficher_progression, args=(progression, arret), daemon=True)
+    afficheur.start()
+    try:
+        client = connect_to_qdrant(prefer_grpc=args.grpc)
+        if args.reconstruire:
+            reconstruire(client, args.collection, args.folder, garder=args.garder, **options)
+        else:
+            preparer_collection(client, args.collection, args.folder, **options)
+    finally:
+        arret.set()
+        afficheur.join()
+        if progression.etape == ETAPE_DOCUMENTS:
+            # Run interrompu : la ligne de progression n'a pas été terminée par le bilan
+            print()
+
+    print(f"\n🏷️ '{args.collection}' → {resoudre_alias(client, args.collection) or args.collection}")
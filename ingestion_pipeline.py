@@ -0,0 +1,442 @@
+import collections
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from pdf_extraction import iter_pages_mots
+from extraction_cache import iter_extract_cached
+from chunking import ChunkerFlux
+from doc_store import offsets_chunks
+from dedup_chunks import fusionner_doublons
+from index_checkpoint import (
+    cle_index,
+    dernier_chunk_acquis,
+    marquer_acquis,
+    point_id,
+    sauvegarder_checkpoint
+)
+
+# Marqueur de fin de flux entre deux étapes
+FIN = object()
+
+# Marqueur de l'étape d'extraction en flux : la lecture du document a échoué en cours de route
+ECHEC = object()
+
+
+class StatsEtape:
+    """Débit, temps d'occupation et profondeur de la file d'entrée d'une étape."""
+
+    def __init__(self, nom, unite):
+        self.nom = nom
+        self.unite = unite
+        self.items = 0
+        self.tokens = 0
+        self.occupe = 0.0
+        self.profondeur_max = 0
+        self.profondeur_cumul = 0
+        self.echantillons = 0
+
+    def echantillonner(self, file_entree):
+        """Relève la profondeur de la file d'entrée de l'étape."""
+        profondeur = file_entree.qsize()
+        self.profondeur_max = max(self.profondeur_max, profondeur)
+        self.profondeur_cumul += profondeur
+        self.echantillons += 1
+
+    def resume(self, duree_totale):
+        """Retourne les statistiques de l'étape sous forme de dictionnaire."""
+        return {
+            "etape": self.nom,
+            "unite": self.unite,
+            "items": self.items,
+            "tokens": self.tokens,
+            "duree": self.occupe,
+            "debit": self.items / self.occupe if self.occupe > 0 else 0.0,
+            "occupation": self.occupe / duree_totale if duree_totale > 0 else 0.0,
+            "file_moyenne": self.profondeur_cumul / self.echantillons if self.echantillons else 0.0,
+            "file_max": self.profondeur_max,
+        }
+
+
+class IngestionPipeline:
+    """Pipeline d'ingestion en flux : extraction → chunking → embedding → upsert.
+
+    Chaque étape tourne dans son propre thread et les étapes communiquent par
+    des files bornées. Les lots sont écrits sans attendre (`wait=False`) et
+    le dernier avec `wait=True`, qui sert de barrière : Qdrant applique les
+    mises à jour dans l'ordre. Options : `streaming` (PDFs lus page par page,
+    `ChunkerFlux`), `doc_store` (payloads par offsets), `dedup` (chunks quasi
+    dupliqués écartés), `progression` et `compter_tokens` (bilan du run).
+    """
+
+    def __init__(self, client, collection_name, embed_fn, chunk_fn, taille_chunk, chevauchement,
+                 hashes, checkpoint, batch_size=50, embedding_batch_size=64, extraction_workers=None,
+                 queue_size=8, streaming=False, unite_chunk="mots", doc_store=None, dedup=None, upload_workers=1,
+                 progression=None, compter_tokens=None):
+        self.client = client
+        self.collection_name = collection_name
+        self.embed_fn = embed_fn
+        self.chunk_fn = chunk_fn
+        self.taille_chunk = taille_chunk
+        self.chevauchement = chevauchement
+        self.unite_chunk = unite_chunk
+        self.doc_store = doc_store
+        self.dedup = dedup
+        self.doublons = 0
+        self.caracteres_doublons = 0
+        self.hashes = hashes
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.embedding_batch_size = embedding_batch_size
+        self.extraction_workers = extraction_workers
+        self.upload_workers = max(1, upload_workers)
+        self.progression = progression
+        self.compter_tokens = compter_tokens
+        self.fichiers_termines = set()
+        self.echecs = set()
+        self.streaming = streaming
+
+        self.files = {
+            "chunking": queue.Queue(maxsize=queue_size),
+            "embedding": queue.Queue(maxsize=queue_size * embedding_batch_size),
+            "upload": queue.Queue(maxsize=queue_size),
+        }
+        self.stats = {
+            "extraction": StatsEtape("extraction", "fichiers"),
+            "chunking": StatsEtape("chunking", "chunks"),
+            "embedding": StatsEtape("embedding", "chunks"),
+            "upload": StatsEtape("upload", "points"),
+        }
+        self.totaux = {}
+        self.arret = threading.Event()
+        self.erreur = None
+
+    def _put(self, file, item):
+        """Dépose un élément dans une file bornée, en abandonnant si le pipeline s'arrête."""
+        while not self.arret.is_set():
+            try:
+                file.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, nom_file):
+        """Récupère l'élément suivant d'une file en relevant sa profondeur."""
+        file = self.files[nom_file]
+        while not self.arret.is_set():
+            try:
+                item = file.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.stats[nom_file].echantillonner(file)
+            return item
+        return FIN
+
+    def _etape(self, cible, sortie):
+        """Exécute une étape et propage FIN (ou l'arrêt en cas d'erreur) à l'étape suivante."""
+        try:
+            cible()
+        except Exception as e:
+            self.erreur = e
+            self.arret.set()
+        finally:
+            if sortie is not None:
+                self._put(self.files[sortie], FIN)
+
+    def _extraction(self, pdf_paths):
+        if self.streaming:
+            return self._extraction_flux(pdf_paths)
+        stats = self.stats["extraction"]
+        debut = time.perf_counter()
+        hashes = {pdf_path: self.hashes[os.path.basename(pdf_path)] for pdf_path in pdf_paths}
+        for pdf_path, paragraphes in iter_extract_cached(pdf_paths, hashes, max_workers=self.extraction_workers):
+            stats.occupe += time.perf_counter() - debut
+            stats.items += 1
+            if not self._put(self.files["chunking"], (os.path.basename(pdf_path), paragraphes)):
+                return
+            debut = time.perf_counter()
+
+    def _extraction_flux(self, pdf_paths):
+        """Envoie les mots de chaque page à l'étape de chunking, puis un marqueur de fin de document."""
+        stats = self.stats["extraction"]
+        for pdf_path in pdf_paths:
+            pdf_file = os.path.basename(pdf_path)
+            debut = time.perf_counter()
+            fin_document = None
+            try:
+                for mots in iter_pages_mots(pdf_path):
+                    stats.occupe += time.perf_counter() - debut
+                    if not self._put(self.files["chunking"], (pdf_file, mots)):
+                        return
+                    debut = time.perf_counter()
+            except OSError as e:
+                print(f"⚠️ {e} : fichier ignoré, il sera retraité au prochain run.")
+                fin_document = ECHEC
+            stats.occupe += time.perf_counter() - debut
+            stats.items += 1
+            if not self._put(self.files["chunking"], (pdf_file, fin_document)):
+                return
+
+    def _point_id(self, file_hash, chunk_number):
+        return point_id(file_hash, self.taille_chunk, self.chevauchement, chunk_number, self.unite_chunk,
+                        self.dedup is not None)
+
+    def _emettre(self, pdf_file, chunk_number, chunk, offsets=None):
+        """Transmet un chunk à l'étape d'embedding, sauf s'il a déjà été acquis lors d'un run interrompu.
+
+        Un quasi-doublon est transmis avec l'identifiant du point conservé, pour
+        être compté comme acquis sans être encodé.
+        """
+        file_hash = self.hashes[pdf_file]
+        if chunk_number <= dernier_chunk_acquis(self.checkpoint, pdf_file, file_hash):
+            return True
+        doublon_de = None
+        if self.dedup is not None:
+            doublon_de = self.dedup.trouver_ou_ajouter(chunk, self._point_id(file_hash, chunk_number))
+        self.stats["chunking"].items += 1
+        return self._put(self.files["embedding"], (pdf_file, file_hash, chunk_number, chunk, offsets, doublon_de))
+
+    def _chunking(self):
+        if self.streaming:
+            return self._chunking_flux()
+        stats = self.stats["chunking"]
+        while (item := self._get("chunking")) is not FIN:
+            debut = time.perf_counter()
+            pdf_file, paragraphes = item
+            if not paragraphes:
+                continue
+            chunks = self.chunk_fn(paragraphes)
+            self.totaux[pdf_file] = len(chunks)
+            offsets = [None] * len(chunks)
+            if self.doc_store is not None:
+                texte = " ".join(paragraphes)
+                offsets = offsets_chunks(texte, chunks)
+                self.doc_store.ajouter(self.hashes[pdf_file], texte)
+            stats.occupe += time.perf_counter() - debut
+            for j, (chunk, offset) in enumerate(zip(chunks, offsets)):
+                if not self._emettre(pdf_file, j + 1, chunk, offset):
+                    return
+
+    def _chunking_flux(self):
+        """Découpe les pages reçues au fil de l'eau, sans jamais matérialiser le document entier.
+
+        Un document dont la lecture échoue (`ECHEC`) est ajouté à `echecs`.
+        """
+        stats = self.stats["chunking"]
+        chunker = None
+        numero = 0
+        while (item := self._get("chunking")) is not FIN:
+            debut = time.perf_counter()
+            pdf_file, mots = item
+            if mots is ECHEC:
+                # Document tronqué : sans total de chunks, il n'est jamais marqué terminé
+                self.echecs.add(pdf_file)
+                chunker = None
+                continue
+            if chunker is None:
+                chunker = ChunkerFlux(self.taille_chunk, self.chevauchement)
+                numero = 0
+            if mots is None:
+                chunks = chunker.terminer()
+                chunker = None
+            else:
+                chunks = chunker.ajouter(mots)
+            stats.occupe += time.perf_counter() - debut
+            for chunk in chunks:
+                numero += 1
+                if not self._emettre(pdf_file, numero, chunk):
+                    return
+            if mots is None and numero:
+                self.totaux[pdf_file] = numero
+
+    def _embedding(self):
+        stats = self.stats["embedding"]
+        lot = []
+        fin = False
+        while not fin:
+            item = self._get("embedding")
+            fin = item is FIN
+            if not fin:
+                lot.append(item)
+            if not lot or (len(lot) < self.embedding_batch_size and not fin):
+                continue
+
+            a_encoder = [item for item in lot if item[5] is None]
+            if self.compter_tokens is not None and a_encoder:
+                stats.tokens += self.compter_tokens([item[3] for item in a_encoder])
+            debut = time.perf_counter()
+            doublons = [(item[5], item[0], item[2]) for item in lot if item[5] is not None]
+            self.doublons += len(doublons)
+            self.caracteres_doublons += sum(len(item[3]) for item in lot if item[5] is not None)
+            vecteurs = matrices_float32(self.embed_fn([item[3] for item in a_encoder])) if a_encoder else None
+            ids, payloads = [], []
+            for pdf_file, file_hash, chunk_number, chunk, offsets, _ in a_encoder:
+                payload = {
+                    "file_name": pdf_file,
+                    "chunk_number": chunk_number,
+                    "index_key": cle_index(file_hash, self.taille_chunk, self.chevauchement, self.unite_chunk,
+                                           self.dedup is not None)
+                }
+                if offsets is None:
+                    payload["chunk_text"] = chunk
+                else:
+                    payload["doc_id"] = file_hash
+                    payload["start"], payload["end"] = offsets
+                ids.append(self._point_id(file_hash, chunk_number))
+                payloads.append(payload)
+            stats.occupe += time.perf_counter() - debut
+            stats.items += len(a_encoder)
+            lot = []
+
+            # Les doublons sont rattachés au dernier lot : ils ne sont acquis qu'avec les chunks qui les précèdent
+            bornes = [(i, min(i + self.batch_size, len(ids))) for i in range(0, len(ids), self.batch_size)] or [(0, 0)]
+            for debut_lot, fin_lot in bornes:
+                lot_upload = (
+                    ids[debut_lot:fin_lot],
+                    tranche(vecteurs, debut_lot, fin_lot),
+                    payloads[debut_lot:fin_lot],
+                    doublons if fin_lot == bornes[-1][1] else []
+                )
+                if not self._put(self.files["upload"], lot_upload):
+                    return
+
+    def _upload(self):
+        """Écrit les lots dans Qdrant avec `upload_workers` écritures en parallèle.
+
+        Les lots sont acquittés dans l'ordre d'envoi (checkpoint compris), quel
+        que soit l'ordre dans lequel Qdrant répond. Le dernier lot est retenu et
+        envoyé avec `wait=True` une fois tous les autres acquittés.
+        """
+        stats = self.stats["upload"]
+        en_vol = collections.deque()
+        en_attente = None
+        with ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix="upload") as pool:
+            while True:
+                item = self._get("upload")
+                if self.arret.is_set():
+                    return
+                if en_attente is not None:
+                    debut = time.perf_counter()
+                    if item is FIN:
+                        self._acquitter(en_vol, garder=0)
+                        ecrire_lot(self.client, self.collection_name, en_attente, attendre=True)
+                        self._marquer(en_attente)
+                    else:
+                        en_vol.append((pool.submit(ecrire_lot, self.client, self.collection_name, en_attente), en_attente))
+                        # Au-delà de deux lots en vol par worker, on attend le plus ancien
+                        self._acquitter(en_vol, garder=2 * self.upload_workers)
+                    stats.occupe += time.perf_counter() - debut
+                if item is FIN:
+                    return
+                en_attente = item
+
+    def _acquitter(self, en_vol, garder):
+        """Marque comme acquis, dans l'ordre, les lots terminés en tête de file ; attend tant qu'il en reste plus de `garder`."""
+        while en_vol and (en_vol[0][0].done() or len(en_vol) > garder):
+            future, lot_upload = en_vol.popleft()
+            future.result()
+            self._marquer(lot_upload)
+
+    def _marquer(self, lot_upload):
+        ids, _, payloads, doublons = lot_upload
+        marquer_acquis(self.checkpoint, payloads, self.totaux, self.hashes, doublons)
+        sauvegarder_checkpoint(self.collection_name, self.checkpoint)
+        self.stats["upload"].items += len(ids)
+        if self.progression is not None:
+            fichiers = {payload["file_name"] for payload in payloads} | {pdf_file for _, pdf_file, _ in doublons}
+            termines = {f for f in fichiers if self.checkpoint["fichiers"][f].get("termine")} - self.fichiers_termines
+            self.fichiers_termines |= termines
+            self.progression.avancer(len(termines), len(ids) + len(doublons))
+
+    def run(self, pdf_paths):
+        """Exécute le pipeline sur les PDFs donnés et retourne les statistiques par étape."""
+        debut = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._etape, args=(lambda: self._extraction(pdf_paths), "chunking")),
+            threading.Thread(target=self._etape, args=(self._chunking, "embedding")),
+            threading.Thread(target=self._etape, args=(self._embedding, "upload")),
+            threading.Thread(target=self._etape, args=(self._upload, None)),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.erreur is not None:
+            raise self.erreur
+
+        # Après la barrière wait=True, les points conservés existent tous : on y reporte leurs doublons
+        if self.checkpoint.get("doublons"):
+            fusionner_doublons(self.client, self.collection_name, self.checkpoint.pop("doublons"))
+            sauvegarder_checkpoint(self.collection_name, self.checkpoint)
+
+        duree = time.perf_counter() - debut
+        resumes = [stats.resume(duree) for stats in self.stats.values()]
+        if self.progression is not None:
+            self.progression.terminer()
+        afficher_stats(resumes, duree, self.doublons)
+        return resumes
+
+
+def matrices_float32(embeddings):
+    """Convertit la sortie de `embed_fn` en matrice float32 contiguë (ou en dictionnaire de matrices par vecteur nommé)."""
+    if isinstance(embeddings, dict):
+        return {nom: np.ascontiguousarray(matrice, dtype=np.float32) for nom, matrice in embeddings.items()}
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def tranche(vecteurs, debut, fin):
+    """Sélectionne les lignes [debut, fin) d'une matrice ou de chaque matrice d'un dictionnaire (vues, sans copie)."""
+    if vecteurs is None:
+        return None
+    if isinstance(vecteurs, dict):
+        return {nom: matrice[debut:fin] for nom, matrice in vecteurs.items()}
+    return vecteurs[debut:fin]
+
+
+def ecrire_lot(client, collection_name, lot_upload, attendre=False):
+    """Écrit un lot (ids, vecteurs, payloads, doublons) dans Qdrant.
+
+    Les vecteurs restent des matrices numpy jusqu'au client Qdrant, qui les
+    sérialise directement (protobuf en gRPC) au lieu de passer par des
+    listes de floats Python. `attendre=False` rend la main dès que le lot est
+    écrit dans le WAL.
+    """
+    ids, vecteurs, payloads, _ = lot_upload
+    if not ids:
+        return
+    client.upload_collection(
+        collection_name=collection_name,
+        vectors=vecteurs,
+        payload=payloads,
+        ids=ids,
+        batch_size=len(ids),
+        parallel=1,
+        wait=attendre
+    )
+
+
+def afficher_stats(resumes, duree, doublons=0):
+    """Affiche le bilan du run, le débit et la file d'attente de chaque étape, et signale le goulot d'étranglement.
+
+    Le débit de chaque étape est aussi exprimé en chunks/s (chunks du run
+    divisés par le temps d'occupation de l'étape), pour les comparer.
+    """
+    etapes = {r["etape"]: r for r in resumes}
+    chunks = etapes["chunking"]["items"]
+    print(f"\n📊 Pipeline d'ingestion terminé en {duree:.1f}s : {etapes['extraction']['items']} fichiers, "
+          f"{chunks} chunks ({doublons} doublons), {etapes['embedding']['tokens']} tokens, "
+          f"embedding {etapes['embedding']['duree']:.1f}s, upload {etapes['upload']['duree']:.1f}s")
+    for r in resumes:
+        chunks_par_s = chunks / r["duree"] if r["duree"] > 0 else 0.0
+        print(f"  {r['etape']:<11} {r['items']:>7} {r['unite']:<8} "
+              f"{r['debit']:>8.1f} {r['unite']}/s {chunks_par_s:>8.1f} chunks/s  occupation {r['occupation']:>4.0%}  "
+              f"file moy. {r['file_moyenne']:.1f} / max {r['file_max']}")
+    goulot = max(resumes, key=lambda r: r["occupation"])
+    print(f"  Goulot d'étranglement : {goulot['etape']}")
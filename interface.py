@@ -6,10 +6,11 @@ config.set_option("server.fileWatcherType", "none")
 
 from indexall_minilm import (
     connect_to_qdrant,
-    create_collection,
-    index_all_pdfs,
+    COLLECTION_NAME,
+    VECTEURS,
     get_similar_documents
 )
+from indexation_arriere_plan import IndexationArrierePlan
 from query_gen import generate_query
 from agnooo import retrieve_and_ask
 import pandas as pd
@@ -132,13 +133,21 @@ st.markdown("""
 @st.cache_resource
 def initialize_qdrant():
     # Initialisation de la connexion Qdrant
-    collection_name = "corpus_a"
     client = connect_to_qdrant()
-    should_index = create_collection(client, collection_name, 384)  # Taille des embeddings MiniLM-L6
-    if should_index:
-        with st.spinner("Indexation des documents PDF en cours..."):
-            index_all_pdfs(client, collection_name, "ALLERG_IA")
-    return client, collection_name
+    # Recherches via l'alias (bascule sans coupure lors d'une reconstruction) ; les PDFs nouveaux
+    # ou modifiés sont indexés en arrière-plan, une seule fois pour toutes les sessions
+    indexation = IndexationArrierePlan(client, COLLECTION_NAME, "ALLERG_IA", vectors=VECTEURS, dedup=True)
+    return client, indexation.alias, indexation.demarrer()
+
+# Avancement de l'indexation, rafraîchi sans recharger la page
+@st.fragment(run_every=2)
+def afficher_indexation(indexation):
+    if indexation.etat == "prete":
+        st.success(indexation.resume())
+    elif indexation.etat == "erreur":
+        st.error(indexation.resume())
+    else:
+        st.progress(indexation.progression.instantane()["fraction"], text=indexation.resume())
 
 # Sidebar pour la configuration et les informations
 with st.sidebar:
@@ -172,11 +181,14 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Initialisation de Qdrant (avec cache pour éviter la réindexation)
-client, collection_name = initialize_qdrant()
+client, collection_name, indexation = initialize_qdrant()
 
 # En-tête principal
 st.markdown('<h1 class="main-header">🩺 Assistant IA pour discussions Médicales</h1>', unsafe_allow_html=True)
 
+# État de l'index : les recherches restent possibles pendant une mise à jour, pas pendant la première construction
+afficher_indexation(indexation)
+
 # Tabs pour organiser l'interface
 tab1, tab2 = st.tabs(["Analyse de discussion", "Documentation"])
 
@@ -200,7 +212,10 @@ with tab1:
     
     # Analyse de la discussion
     if analyze_button:
-        if discussion_text.strip():
+        if not indexation.interrogeable():
+            st.warning("⏳ L'index documentaire est en préchauffage : l'analyse sera disponible à la fin de la "
+                       "première indexation.")
+        elif discussion_text.strip():
             # Initialiser les temps pour chaque étape
             timings = {
                 "start_time": time.time(),
@@ -287,7 +302,7 @@ with tab1:
                     # Récupérer les documents similaires et mesurer le temps
                     docs_start = time.time()
                     with st.spinner("Recherche de documents pertinents..."):
-                        top_docs = get_similar_documents(client, collection_name, query, num_results)
+                        top_docs = get_similar_documents(client, collection_name, query, num_results, vector="minilm")
                     timings["document_retrieval_time"] = time.time() - docs_start
                     
                     # Filtrer les documents avec un score > seuil
@@ -460,7 +475,7 @@ with tab2:
     
     ### Base documentaire
     
-    L'application utilise une base de connaissances spécialisée en allergologie stockée dans la collection "corpus_a".
+    L'application utilise une base de connaissances spécialisée en allergologie stockée dans la collection "corpus_medical" (vecteurs MiniLM et SapBERT).
     """)
 
 # Pied de page
@@ -0,0 +1,29 @@
+import threading
+
+
+class LazySingleton:
+    """Ressource (modèle, client d'API…) créée au premier appel, une seule fois.
+
+    La création est protégée par un verrou : plusieurs threads (sessions
+    Streamlit, pipeline d'ingestion) qui demandent la ressource en même temps
+    attendent la même instance au lieu d'en charger chacun une.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.instance = None
+        self.charge = False
+
+    def __call__(self):
+        if not self.charge:
+            with self.lock:
+                if not self.charge:
+                    self.instance = self.factory()
+                    self.charge = True
+        return self.instance
+
+
+def lazy_singleton(factory):
+    """Décorateur : transforme une fonction de création en accesseur paresseux et thread-safe."""
+    return LazySingleton(factory)
@@ -12,10 +12,11 @@ config.set_option("server.fileWatcherType", "none")
 # Imports des modules exactement comme dans interface.py
 from indexall_minilm import (
     connect_to_qdrant,
-    create_collection,
-    index_all_pdfs,
+    COLLECTION_NAME,
+    VECTEURS,
     get_similar_documents
 )
+from indexation_arriere_plan import IndexationArrierePlan
 from query_gen import generate_query
 from agnooo import retrieve_and_ask
 from should_ask import evaluer_recommandation
@@ -25,19 +26,27 @@ import tempfile
 import wave
 import pyaudio
 import numpy as np
-from groq import Groq
-import google.generativeai as genai
 from dotenv import load_dotenv
+from lazy import lazy_singleton
 
 load_dotenv()
 
+# Clients API créés au premier enregistrement (groq et google.generativeai sont lents à importer)
+@lazy_singleton
+def get_groq_client():
+    from groq import Groq
+
+    return Groq()
+
+@lazy_singleton
+def get_gemini_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai.GenerativeModel('gemini-2.0-flash-exp')
+
 class LiveMedicalAssistant:
     def __init__(self):
-        # Configuration API
-        self.groq_client = Groq()
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        self.gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
         # Configuration audio
         self.chunk = 1024
         self.format = pyaudio.paInt16
@@ -114,7 +123,7 @@ class LiveMedicalAssistant:
         try:
             # 1. Transcription avec Groq
             with open(audio_file_path, "rb") as file:
-                transcription = self.groq_client.audio.transcriptions.create(
+                transcription = get_groq_client().audio.transcriptions.create(
                     file=(audio_file_path, file.read()),
                     model="whisper-large-v3-turbo",
                     language="fr"
@@ -171,7 +180,9 @@ Transcription brute:
 IMPORTANT: Ne réponds que par la conversation structurée, rien d'autre."""
 
         try:
-            response = self.gemini_model.generate_content(
+            import google.generativeai as genai
+
+            response = get_gemini_model().generate_content(
                 prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.1,
@@ -191,6 +202,9 @@ IMPORTANT: Ne réponds que par la conversation structurée, rien d'autre."""
             if 'qdrant_client' not in st.session_state or 'collection_name' not in st.session_state:
                 self.latest_suggestion = "⏳ Initialisation du système en cours..."
                 return
+            if not st.session_state.indexation.interrogeable():
+                self.latest_suggestion = "⏳ Index documentaire en préchauffage : les suggestions seront disponibles à la fin de la première indexation."
+                return
             
             # 1. Générer la query
             query = generate_query(self.structured_conversation)
@@ -248,7 +262,7 @@ IMPORTANT: Ne réponds que par la conversation structurée, rien d'autre."""
                 num_results = 5
                 threshold = 0.70
                 
-                top_docs = get_similar_documents(client, collection_name, query, num_results)
+                top_docs = get_similar_documents(client, collection_name, query, num_results, vector="minilm")
                 filtered_docs = [doc for doc in top_docs if doc['score'] > threshold]
                 
                 # 5. Générer suggestion
@@ -522,13 +536,21 @@ st.markdown("""
 @st.cache_resource
 def initialize_qdrant():
     # Initialisation de la connexion Qdrant
-    collection_name = "corpus_a"
     client = connect_to_qdrant()
-    should_index = create_collection(client, collection_name, 384)  # Taille des embeddings MiniLM-L6
-    if should_index:
-        with st.spinner("Indexation des documents PDF en cours..."):
-            index_all_pdfs(client, collection_name, "ALLERG_IA")
-    return client, collection_name
+    # Recherches via l'alias (bascule sans coupure lors d'une reconstruction) ; les PDFs nouveaux
+    # ou modifiés sont indexés en arrière-plan, une seule fois pour toutes les sessions
+    indexation = IndexationArrierePlan(client, COLLECTION_NAME, "ALLERG_IA", vectors=VECTEURS, dedup=True)
+    return client, indexation.alias, indexation.demarrer()
+
+# Avancement de l'indexation, rafraîchi sans recharger la page
+@st.fragment(run_every=2)
+def afficher_indexation(indexation):
+    if indexation.etat == "prete":
+        st.success(indexation.resume())
+    elif indexation.etat == "erreur":
+        st.error(indexation.resume())
+    else:
+        st.progress(indexation.progression.instantane()["fraction"], text=indexation.resume())
 
 @st.cache_resource
 def initialize_assistant():
@@ -540,11 +562,12 @@ if not os.getenv("GROQ_API_KEY") or not os.getenv("GEMINI_API_KEY"):
     st.stop()
 
 # CORRECTION: Initialisation dans le bon ordre
-client, collection_name = initialize_qdrant()
+client, collection_name, indexation = initialize_qdrant()
 
 # STOCKER IMMÉDIATEMENT dans session_state
 st.session_state.qdrant_client = client
 st.session_state.collection_name = collection_name
+st.session_state.indexation = indexation
 
 # Puis initialiser l'assistant APRÈS
 if 'assistant' not in st.session_state:
@@ -572,6 +595,9 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# État de l'index : les suggestions restent possibles pendant une mise à jour, pas pendant la première construction
+afficher_indexation(indexation)
+
 # Panneau de contrôle
 st.markdown('<div class="control-panel">', unsafe_allow_html=True)
 
@@ -1,21 +1,20 @@
 from indexall_minilm import (
     connect_to_qdrant,
-    create_collection,
-    index_all_pdfs,
+    COLLECTION_NAME,
+    VECTEURS,
     get_similar_documents
 )
+from collection_versions import preparer_collection
 from query_gen import generate_query
 from agnooo import retrieve_and_ask
 
 
 if __name__ == "__main__":
-    collection_name = "corpus_a"
     client = connect_to_qdrant()
 
-    should_index = create_collection(client, collection_name, 384)  # Taille des embeddings MiniLM-L6
-
-    if should_index:
-        index_all_pdfs(client, collection_name, "ALLERG_IA")
+    # Alias vers la version active de l'index (vecteurs MiniLM et SapBERT sur les mêmes points) ;
+    # n'indexe que les PDFs nouveaux ou modifiés depuis le dernier lancement
+    collection_name = preparer_collection(client, COLLECTION_NAME, "ALLERG_IA", vectors=VECTEURS, dedup=True)
 
     conversation_text = """ 
 
@@ -39,7 +38,7 @@ if __name__ == "__main__":
     # 🔹 Afficher le résultat
     print("🔎 Query générée :", query)
 
-    top_docs = get_similar_documents(client, collection_name, query, 5)
+    top_docs = get_similar_documents(client, collection_name, query, 5, vector="minilm")
 
     for doc in top_docs:
         print(f"**Fichier** : {doc['file_name']}")
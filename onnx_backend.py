@@ -0,0 +1,133 @@
+import os
+import re
+import threading
+
+import numpy as np
+
+# Backend d'encodage : "torch" (par défaut) ou "onnx"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Quantization dynamique int8 des poids du modèle ONNX (EMBEDDING_ONNX_INT8=0 pour rester en float32)
+ONNX_INT8 = os.getenv("EMBEDDING_ONNX_INT8", "1") != "0"
+
+# Dossier des modèles exportés
+ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", ".onnx_models")
+
+# Nombre de threads d'ONNX Runtime (0 : choix automatique)
+ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+
+
+def identifiant_backend(model_name):
+    """Identifiant du couple (modèle, backend), pour ne pas mélanger leurs vecteurs dans le cache."""
+    if EMBEDDING_BACKEND != "onnx":
+        return model_name
+    return f"{model_name}@onnx-int8" if ONNX_INT8 else f"{model_name}@onnx"
+
+
+def chemins_onnx(model_name, dossier=ONNX_DIR):
+    """Retourne les chemins des modèles ONNX float32 et int8 d'un encodeur."""
+    base = os.path.join(dossier, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+    return os.path.join(base, "model.onnx"), os.path.join(base, "model.int8.onnx")
+
+
+def exporter_onnx(model_name, quantize=True, dossier=ONNX_DIR):
+    """Exporte l'encodeur Transformers d'un modèle vers ONNX, puis le quantifie en int8.
+
+    L'export produit `last_hidden_state` avec des axes batch / séquence
+    dynamiques ; le pooling est fait ensuite côté numpy. Les fichiers déjà
+    exportés sont réutilisés.
+    """
+    chemin_fp32, chemin_int8 = chemins_onnx(model_name, dossier)
+
+    if not os.path.exists(chemin_fp32):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        entrees = tokenizer(["export onnx"], return_tensors="pt")
+        noms = list(entrees.keys())
+
+        class Encodeur(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *args):
+                return self.model(**dict(zip(noms, args))).last_hidden_state
+
+        os.makedirs(os.path.dirname(chemin_fp32), exist_ok=True)
+        axes = {nom: {0: "batch", 1: "sequence"} for nom in noms}
+        axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.inference_mode():
+            torch.onnx.export(
+                Encodeur(model), tuple(entrees[nom] for nom in noms), chemin_fp32,
+                input_names=noms, output_names=["last_hidden_state"],
+                dynamic_axes=axes, opset_version=14
+            )
+        print(f"✅ Modèle ONNX exporté : {chemin_fp32}")
+
+    if quantize and not os.path.exists(chemin_int8):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(chemin_fp32, chemin_int8, weight_type=QuantType.QInt8)
+        print(f"✅ Modèle ONNX quantifié en int8 : {chemin_int8}")
+
+    return chemin_int8 if quantize else chemin_fp32
+
+
+class OnnxEncoder:
+    """Encodeur de phrases exécuté par ONNX Runtime sur CPU.
+
+    `pooling="mean"` reproduit le pooling de SentenceTransformer (MiniLM),
+    `pooling="cls"` prend le token [CLS] (SapBERT).
+    """
+
+    def __init__(self, model_name, pooling="mean", max_length=512, quantize=ONNX_INT8, threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.pooling = pooling
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # ONNX_THREADS est relu à la création : un processus du pool d'encodage le fixe à son démarrage
+        threads = ONNX_THREADS if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+        chemin = exporter_onnx(model_name, quantize=quantize)
+        self.session = ort.InferenceSession(chemin, options, providers=["CPUExecutionProvider"])
+        self.noms_entrees = [entree.name for entree in self.session.get_inputs()]
+        # last_hidden_state : (batch, séquence, dimension), seule la dimension est fixe
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts, batch_size=32):
+        """Encode une liste de textes et retourne une matrice float32 contiguë."""
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        vecteurs = []
+        for debut in range(0, len(texts), batch_size):
+            entrees = self.tokenizer(list(texts[debut:debut + batch_size]), padding=True, truncation=True,
+                                     max_length=self.max_length, return_tensors="np")
+            sorties = self.session.run(None, {nom: entrees[nom].astype(np.int64) for nom in self.noms_entrees})[0]
+            if self.pooling == "cls":
+                vecteurs.append(sorties[:, 0, :])
+            else:
+                masque = entrees["attention_mask"][..., None].astype(np.float32)
+                vecteurs.append((sorties * masque).sum(axis=1) / np.clip(masque.sum(axis=1), 1e-9, None))
+        return np.ascontiguousarray(np.concatenate(vecteurs), dtype=np.float32)
+
+
+_encodeurs = {}
+_encodeurs_lock = threading.Lock()
+
+
+def get_onnx_encoder(model_name, pooling, max_length):
+    """Retourne l'encodeur ONNX (partagé, créé au premier appel) d'un modèle."""
+    with _encodeurs_lock:
+        if model_name not in _encodeurs:
+            _encodeurs[model_name] = OnnxEncoder(model_name, pooling=pooling, max_length=max_length)
+        return _encodeurs[model_name]
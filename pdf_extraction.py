@@ -0,0 +1,152 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf  # PyMuPDF
+
+# Au-delà de ce nombre de pages, un document est découpé en plages réparties sur plusieurs workers
+PAGES_PAR_TACHE = 40
+
+
+def nettoyer_pages(contenu_complet):
+    """Nettoie le texte brut des pages et le découpe en paragraphes."""
+    texte_propre = re.sub(r"\n{2,}", "\n", "\n".join(contenu_complet))
+    texte_propre = re.sub(r"\s+", " ", texte_propre).strip()
+
+    return [p.strip() for p in texte_propre.split("\n") if p.strip()]
+
+
+def extract_text_from_pdf(pdf_path):
+    """Extrait et nettoie le texte d'un PDF en paragraphes."""
+    try:
+        doc = pymupdf.open(pdf_path)
+        contenu_complet = []
+
+        for num_page in range(len(doc)):
+            page = doc[num_page]
+            texte = page.get_text("text").strip()
+
+            if texte:
+                contenu_complet.append(texte)
+
+        doc.close()
+
+        if not contenu_complet:
+            print(f"Le document {pdf_path} est vide ou illisible.")
+            return []
+
+        return nettoyer_pages(contenu_complet)
+
+    except Exception as e:
+        print(f"Erreur de lecture du PDF {pdf_path} : {e}")
+        return []
+
+
+def iter_pages_mots(pdf_path):
+    """Extrait un PDF en flux : produit la liste des mots de chaque page, une page à la fois.
+
+    Le nettoyage de `extract_text_from_pdf` ne fait que normaliser les blancs,
+    les mots produits sont donc exactement ceux des paragraphes extraits. Une
+    erreur de lecture, même en cours de document, lève OSError : le document
+    tronqué ne doit pas être considéré comme indexé.
+    """
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            vide = True
+            for num_page in range(len(doc)):
+                mots = doc[num_page].get_text("text").split()
+                if mots:
+                    vide = False
+                    yield mots
+    except Exception as e:
+        raise OSError(f"Erreur de lecture du PDF {pdf_path} : {e}") from e
+
+    if vide:
+        print(f"Le document {pdf_path} est vide ou illisible.")
+
+
+def _compter_pages(pdf_path):
+    """Retourne le nombre de pages d'un PDF, ou None s'il est illisible."""
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            return len(doc)
+    except Exception as e:
+        print(f"Erreur de lecture du PDF {pdf_path} : {e}")
+        return None
+
+
+def _extraire_pages(pdf_path, debut, fin):
+    """Extrait le texte brut non vide des pages [debut, fin) d'un PDF (exécuté dans un worker)."""
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            pages = []
+            for num_page in range(debut, fin):
+                texte = doc[num_page].get_text("text").strip()
+                if texte:
+                    pages.append(texte)
+            return pages
+    except Exception as e:
+        print(f"Erreur de lecture du PDF {pdf_path} (pages {debut}-{fin - 1}) : {e}")
+        return None
+
+
+def _plages_de_pages(nb_pages, pages_par_tache):
+    """Découpe [0, nb_pages) en plages contiguës d'au plus `pages_par_tache` pages."""
+    return [(debut, min(debut + pages_par_tache, nb_pages)) for debut in range(0, nb_pages, pages_par_tache)]
+
+
+def _assembler(pdf_path, resultats_plages):
+    """Recompose les plages d'un document dans l'ordre des pages et applique le nettoyage."""
+    if any(pages is None for pages in resultats_plages):
+        return []
+
+    contenu_complet = [texte for pages in resultats_plages for texte in pages]
+    if not contenu_complet:
+        print(f"Le document {pdf_path} est vide ou illisible.")
+        return []
+
+    return nettoyer_pages(contenu_complet)
+
+
+def iter_extract_parallel(pdf_paths, max_workers=None, pages_par_tache=PAGES_PAR_TACHE):
+    """Extrait les paragraphes de plusieurs PDFs avec un pool de processus.
+
+    Les fichiers sont répartis entre les workers et les gros documents sont
+    découpés en plages de pages. Les couples (pdf_path, paragraphes) sont
+    produits dans l'ordre de `pdf_paths`, avec exactement le même résultat
+    que `extract_text_from_pdf`.
+    """
+    pdf_paths = list(pdf_paths)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1:
+        for pdf_path in pdf_paths:
+            yield pdf_path, extract_text_from_pdf(pdf_path)
+        return
+
+    # Fenêtre glissante de fichiers en cours pour borner la mémoire sur les gros corpus
+    fenetre = max_workers * 2
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        en_cours = []
+        suivant = 0
+
+        while suivant < len(pdf_paths) or en_cours:
+            while suivant < len(pdf_paths) and len(en_cours) < fenetre:
+                pdf_path = pdf_paths[suivant]
+                suivant += 1
+                nb_pages = _compter_pages(pdf_path)
+                if nb_pages is None:
+                    en_cours.append((pdf_path, None))
+                    continue
+                futures = [
+                    executor.submit(_extraire_pages, pdf_path, debut, fin)
+                    for debut, fin in _plages_de_pages(nb_pages, pages_par_tache)
+                ]
+                en_cours.append((pdf_path, futures))
+
+            pdf_path, futures = en_cours.pop(0)
+            if futures is None:
+                yield pdf_path, []
+                continue
+            yield pdf_path, _assembler(pdf_path, [future.result() for future in futures])
@@ -1,12 +1,16 @@
 import os
 from dotenv import load_dotenv
-import groq
+from lazy import lazy_singleton
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Configuration du client Groq
-client = groq.Client(api_key=GROQ_API_KEY)
+# Configuration du client Groq (créé au premier appel)
+@lazy_singleton
+def get_client():
+    import groq
+
+    return groq.Client(api_key=GROQ_API_KEY)
 
 def generate_query(conversation_text):
     prompt = """
@@ -21,7 +25,7 @@ def generate_query(conversation_text):
     Format: Phrases concises, termes techniques séparés par des virgules, sans questions. Priorise les éléments actionnables pour l'exploration médicale.
         """
     
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="qwen-qwq-32b", 
         messages=[
             {"role": "system", "content": prompt},
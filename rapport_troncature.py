@@ -0,0 +1,48 @@
+import argparse
+import os
+
+from transformers import AutoTokenizer
+
+from extraction_cache import iter_extract_cached
+from chunking import generer_chunks_paragraphes, generer_chunks_tokens, mesurer_troncature
+
+# Modèle, longueur maximale et découpage en mots utilisés par chaque module d'embedding
+MODELES = {
+    "minilm": ("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", 128, 128, 50),
+    "sapbert": ("cambridgeltl/SapBERT-from-PubMedBERT-fulltext", 512, 200, 75),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mesure les tokens perdus par troncature avec le découpage en mots, "
+                    "et les compare au découpage aligné sur le budget de tokens."
+    )
+    parser.add_argument("--folder", default="ALLERG_IA")
+    parser.add_argument("--model", choices=sorted(MODELES), default="minilm")
+    parser.add_argument("--chevauchement-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    model_name, max_tokens, taille_chunk, chevauchement = MODELES[args.model]
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+    pdf_paths = [os.path.join(args.folder, f) for f in sorted(os.listdir(args.folder)) if f.endswith(".pdf")]
+    chunks_mots, chunks_tokens = [], []
+    for _, paragraphes in iter_extract_cached(pdf_paths):
+        if paragraphes:
+            chunks_mots.extend(generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement))
+            chunks_tokens.extend(generer_chunks_tokens(paragraphes, tokenizer, max_tokens, args.chevauchement_tokens))
+
+    if not chunks_mots:
+        print(f"⚠️ Aucun chunk extrait de '{args.folder}' !")
+        raise SystemExit(1)
+
+    avant = mesurer_troncature(chunks_mots, tokenizer, max_tokens)
+    apres = mesurer_troncature(chunks_tokens, tokenizer, max_tokens)
+
+    print(f"\n📏 {model_name} (max {max_tokens} tokens)")
+    print(f"Découpage en mots ({taille_chunk}/{chevauchement}) : {avant['chunks']} chunks, "
+          f"{avant['chunks_tronques']} tronqués, {avant['tokens_perdus']} tokens jamais encodés "
+          f"({avant['part_perdue']:.1%} des tokens)")
+    print(f"Découpage en tokens ({max_tokens}/{args.chevauchement_tokens}) : {apres['chunks']} chunks, "
+          f"{apres['chunks_tronques']} tronqués, {apres['tokens_perdus']} tokens perdus")
@@ -1,7 +1,12 @@
 import os
-from groq import Groq
+from lazy import lazy_singleton
 
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+# Client Groq créé au premier appel
+@lazy_singleton
+def get_client():
+    from groq import Groq
+
+    return Groq(api_key=os.environ.get("GROQ_API_KEY"))
 
 def evaluer_recommandation(discussion: str, contexte: str) -> str:
     """
@@ -46,7 +51,7 @@ def evaluer_recommandation(discussion: str, contexte: str) -> str:
     """
 
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Conversation à analyser:\n{discussion}\n\nContexte (logigramme et requête générée):\n{contexte}"}
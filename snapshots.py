@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import httpx
+
+from collection_versions import basculer_alias, resoudre_alias
+from doc_store import DOC_STORE_DIR
+from index_manifest import chemin_manifest
+from indexall_minilm import COLLECTION_NAME, QDRANT_URL, connect_to_qdrant
+
+# Dossier des sauvegardes locales (un sous-dossier par snapshot)
+SNAPSHOT_DIR = "snapshots"
+
+# Taille des blocs lus et écrits pendant les transferts
+TAILLE_BLOC = 1 << 20
+
+
+def aliases_de(client, collection_name):
+    """Retourne les alias qui pointent vers une collection."""
+    return [a.alias_name for a in client.get_aliases().aliases if a.collection_name == collection_name]
+
+
+def creer_snapshot(client, nom, url=QDRANT_URL, dossier=SNAPSHOT_DIR, garder_sur_serveur=False):
+    """Sauvegarde une collection (ou la version active d'un alias) dans un dossier local.
+
+    Le dossier contient le snapshot Qdrant (vecteurs, payloads, index et
+    configuration de la collection), le manifest d'indexation et le store de
+    documents de la collection : après restauration, l'indexation
+    incrémentale reconnaît les PDFs déjà indexés au lieu de tout réencoder.
+    Le snapshot est ensuite supprimé du serveur, sauf `garder_sur_serveur`.
+    """
+    debut = time.perf_counter()
+    collection_name = resoudre_alias(client, nom) or nom
+    description = client.create_snapshot(collection_name=collection_name, wait=True)
+    chemin = os.path.join(dossier, f"{collection_name}_{time.strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(chemin)
+
+    # Le fichier peut peser plusieurs Go : il est écrit au fil du téléchargement
+    with httpx.stream("GET", f"{url}/collections/{collection_name}/snapshots/{description.name}", timeout=None) as r:
+        r.raise_for_status()
+        with open(os.path.join(chemin, "qdrant.snapshot"), "wb") as f:
+            for bloc in r.iter_bytes(TAILLE_BLOC):
+                f.write(bloc)
+    if not garder_sur_serveur:
+        client.delete_snapshot(collection_name=collection_name, snapshot_name=description.name, wait=True)
+
+    if os.path.exists(chemin_manifest(collection_name)):
+        shutil.copy2(chemin_manifest(collection_name), os.path.join(chemin, "manifest.json"))
+    if os.path.isdir(os.path.join(DOC_STORE_DIR, collection_name)):
+        shutil.copytree(os.path.join(DOC_STORE_DIR, collection_name), os.path.join(chemin, "doc_store"))
+
+    meta = {
+        "collection": collection_name,
+        "aliases": aliases_de(client, collection_name),
+        "points": client.count(collection_name=collection_name, exact=True).count,
+        "checksum": description.checksum,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(os.path.join(chemin, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    taille = os.path.getsize(os.path.join(chemin, "qdrant.snapshot"))
+    print(f"📸 Snapshot de '{collection_name}' ({meta['points']} points, {taille / 1e6:.1f} Mo) "
+          f"écrit dans '{chemin}' en {time.perf_counter() - debut:.1f}s.")
+    return chemin
+
+
+def restaurer_snapshot(client, chemin, url=QDRANT_URL, collection_name=None, alias=None):
+    """Restaure une sauvegarde de `creer_snapshot`, par exemple sur un serveur neuf.
+
+    Le snapshot est envoyé au serveur, qui recrée la collection telle quelle
+    (index HNSW compris) : aucun PDF n'est relu ni réencodé. Le manifest et
+    le store de documents sont remis en place localement, puis les alias
+    enregistrés (ou `alias`) sont basculés vers la collection restaurée.
+    """
+    debut = time.perf_counter()
+    with open(os.path.join(chemin, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    collection_name = collection_name or meta["collection"]
+
+    # httpx lit le fichier au fil de l'envoi, sans le charger en mémoire
+    with open(os.path.join(chemin, "qdrant.snapshot"), "rb") as f:
+        r = httpx.post(f"{url}/collections/{collection_name}/snapshots/upload",
+                       params={"priority": "snapshot", "wait": "true"},
+                       files={"snapshot": ("qdrant.snapshot", f)}, timeout=None)
+    r.raise_for_status()
+
+    if os.path.exists(os.path.join(chemin, "manifest.json")):
+        os.makedirs(os.path.dirname(chemin_manifest(collection_name)), exist_ok=True)
+        shutil.copy2(os.path.join(chemin, "manifest.json"), chemin_manifest(collection_name))
+    if os.path.isdir(os.path.join(chemin, "doc_store")):
+        cible = os.path.join(DOC_STORE_DIR, collection_name)
+        shutil.rmtree(cible, ignore_errors=True)
+        shutil.copytree(os.path.join(chemin, "doc_store"), cible)
+
+    nombre = client.count(collection_name=collection_name, exact=True).count
+    if nombre != meta["points"]:
+        raise ValueError(f"'{collection_name}' contient {nombre} points après restauration, {meta['points']} attendus.")
+    for nom in [alias] if alias else meta["aliases"]:
+        basculer_alias(client, nom, collection_name)
+    print(f"♻️ '{collection_name}' restaurée ({nombre} points) en {time.perf_counter() - debut:.1f}s.")
+    return collection_name
+
+
+def lister_snapshots(dossier=SNAPSHOT_DIR):
+    """Retourne les sauvegardes locales, de la plus ancienne à la plus récente, avec leurs métadonnées."""
+    if not os.path.isdir(dossier):
+        return []
+    sauvegardes = []
+    for nom in sorted(os.listdir(dossier)):
+        chemin_meta = os.path.join(dossier, nom, "meta.json")
+        if os.path.exists(chemin_meta):
+            with open(chemin_meta, encoding="utf-8") as f:
+                sauvegardes.append((os.path.join(dossier, nom), json.load(f)))
+    return sorted(sauvegardes, key=lambda s: s[1]["date"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sauvegarde et restauration des collections Qdrant.")
+    parser.add_argument("action", choices=["creer", "restaurer", "lister"])
+    parser.add_argument("--collection",
+                        help=f"Collection ou alias à sauvegarder (défaut : {COLLECTION_NAME}) ; "
+                             f"nom de la collection restaurée (défaut : celui de la sauvegarde)")
+    parser.add_argument("--chemin", help="Sauvegarde à restaurer (défaut : la plus récente)")
+    parser.add_argument("--alias", help="Alias à faire pointer vers la collection restaurée")
+    parser.add_argument("--url", default=QDRANT_URL)
+    parser.add_argument("--dossier", default=SNAPSHOT_DIR)
+    parser.add_argument("--garder-sur-serveur", action="store_true",
+                        help="Conserve aussi le snapshot dans le stockage du serveur")
+    args = parser.parse_args()
+
+    client = connect_to_qdrant(url=args.url)
+    if args.action == "creer":
+        creer_snapshot(client, args.collection or COLLECTION_NAME, args.url, args.dossier, args.garder_sur_serveur)
+    elif args.action == "restaurer":
+        chemin = args.chemin
+        if chemin is None:
+            sauvegardes = lister_snapshots(args.dossier)
+            if not sauvegardes:
+                parser.error(f"aucune sauvegarde dans '{args.dossier}'")
+            chemin = sauvegardes[-1][0]
+        restaurer_snapshot(client, chemin, args.url, args.collection, args.alias)
+    else:
+        for chemin, meta in lister_snapshots(args.dossier):
+            aliases = f" (alias : {', '.join(meta['aliases'])})" if meta["aliases"] else ""
+            print(f"  {meta['date']}  {meta['collection']}{aliases}  {meta['points']} points  → {chemin}")
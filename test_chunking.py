@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from chunking import ChunkerFlux, generer_chunks_paragraphes, iter_chunks_mots
+
+
+def paragraphes_aleatoires(rng):
+    """Paragraphes de longueurs variées, y compris vides ou réduits à des blancs."""
+    paragraphes = []
+    for _ in range(rng.randint(0, 12)):
+        mots = [f"m{rng.randint(0, 999)}" for _ in range(rng.randint(0, 60))]
+        paragraphes.append(rng.choice([" ", "  ", "\t"]).join(mots))
+    return paragraphes
+
+
+def pages_de(paragraphes, rng):
+    """Répartit les mots des paragraphes sur des pages de tailles aléatoires (pages vides comprises)."""
+    mots = " ".join(paragraphes).split()
+    pages = []
+    debut = 0
+    while debut < len(mots):
+        fin = debut + rng.randint(0, 40)
+        pages.append(mots[debut:fin])
+        debut = fin
+    return pages
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_chunker_flux_identique_au_decoupage_complet(seed):
+    rng = random.Random(seed)
+    taille_chunk = rng.randint(1, 40)
+    chevauchement = rng.randint(0, taille_chunk - 1)
+    paragraphes = paragraphes_aleatoires(rng)
+
+    attendus = generer_chunks_paragraphes(paragraphes, taille_chunk, chevauchement)
+    obtenus = list(iter_chunks_mots(pages_de(paragraphes, rng), taille_chunk, chevauchement))
+
+    assert obtenus == attendus
+
+
+def test_chunker_flux_refuse_un_chevauchement_trop_grand():
+    with pytest.raises(ValueError):
+        ChunkerFlux(10, 10)